@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Literal
 from ....core.config import settings
-from App.db.session import engine, supabase_engine
+from sqlalchemy.orm import Session
+from App.db.session import engine, supabase_engine, get_db
+from App.repositories import video as video_repo
 import logging
 
 logger = logging.getLogger(__name__)
@@ -108,3 +110,16 @@ async def update_database_mode(config: DBModeUpdate):
         "previous_strategy": old_strategy,
         "new_strategy": config.failure_strategy
     }
+
+
+@router.get("/vector-recall")
+async def get_vector_recall(
+    samples: int = Query(20, ge=1, le=200),
+    top_k: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Recall@k of video search (ANN index, quantization and re-ranking as
+    configured) against exact search, using stored chunks as queries.
+    """
+    return await video_repo.measure_search_recall(db, samples=samples, top_k=top_k)
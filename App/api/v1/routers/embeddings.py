@@ -1,18 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from uuid import UUID
 import uuid
 from App.schemas.embeddings import EmbRequest, EmbResponse
-from App.services.llm import LLMService
+from App.services.llm import LLMService, aget_llm_service
 from App.db.session import get_db
 from App.repositories.chat import create_chat
-from App.repositories.embedding import create_embedding, get_embedding, get_all_embeddings
+from App.repositories.embedding import create_embedding, get_embedding
+from App.services.similarity import similarity_engine
 from App.core.dependencies import get_current_user
 from App.models.user import User
-import numpy as np
 
 router = APIRouter()
-llm_service = LLMService()
 
 
 def to_float_list(array_like) -> list[float]:
@@ -27,6 +27,7 @@ async def create_embedding_endpoint(
     request: EmbRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    llm: LLMService = Depends(aget_llm_service),
 ):
     try:
         chat_id = request.chat_id or str(uuid.uuid4())
@@ -38,7 +39,7 @@ async def create_embedding_endpoint(
             chat_id=chat_id
         )
 
-        embeddings = await llm_service.emb(request.texts)
+        embeddings = await llm.emb(request.texts)
         if not embeddings or not isinstance(embeddings, list):
             raise HTTPException(status_code=500, detail="Embedding service returned invalid result")
 
@@ -62,44 +63,25 @@ async def create_embedding_endpoint(
 async def similarity_search(
     text: str,
     db: Session = Depends(get_db),
+    llm: LLMService = Depends(aget_llm_service),
 ):
     """
     Compare similarity using Cosine, Euclidean, Dot Product, and Hybrid score.
     Returns top 5 similar embeddings for each algorithm.
     """
     try:
-        query_vector = (await llm_service.emb([text]))[0]
+        query_vector = (await llm.emb([text]))[0]
         query_vector = query_vector.tolist() if hasattr(query_vector, "tolist") else query_vector
 
-        all_embeddings = await get_all_embeddings(db)
-        if not all_embeddings:
+        await run_in_threadpool(similarity_engine.ensure_loaded, db)
+        if not len(similarity_engine):
             raise HTTPException(status_code=404, detail="No embeddings in database")
 
-        def cosine_sim(v1, v2):
-            return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-
-        def euclidean_dist(v1, v2):
-            return np.linalg.norm(np.array(v1) - np.array(v2))
-
-        def dot_product(v1, v2):
-            return np.dot(v1, v2)
-
-        def hybrid_score(v1, v2, alpha=0.5):
-            cos = cosine_sim(v1, v2)
-            euclid = euclidean_dist(v1, v2)
-            inv_euclid = 1 / (1 + euclid)
-            return alpha * cos + (1 - alpha) * inv_euclid
-
-        cosine_results = sorted(all_embeddings, key=lambda e: -cosine_sim(query_vector, e.vector))[:5]
-        euclidean_results = sorted(all_embeddings, key=lambda e: euclidean_dist(query_vector, e.vector))[:5]
-        dot_results = sorted(all_embeddings, key=lambda e: -dot_product(query_vector, e.vector))[:5]
-        hybrid_results = sorted(all_embeddings, key=lambda e: -hybrid_score(query_vector, e.vector))[:5]
+        results = await run_in_threadpool(similarity_engine.search, query_vector, 5)
 
         return {
-            "cosine_top5": [{"chat_id": str(e.chat_id)} for e in cosine_results],
-            "euclidean_top5": [{"chat_id": str(e.chat_id)} for e in euclidean_results],
-            "dot_top5": [{"chat_id": str(e.chat_id)} for e in dot_results],
-            "hybrid_top5": [{"chat_id": str(e.chat_id)} for e in hybrid_results],
+            f"{metric}_top5": [{"chat_id": str(chat_id), "score": score} for chat_id, score in hits]
+            for metric, hits in results.items()
         }
 
     except HTTPException:
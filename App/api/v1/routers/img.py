@@ -1,37 +1,55 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from fastapi.concurrency import run_in_threadpool
-from App.services.llm import LLMService
-from App.client.supabase import SupabaseStorage
+from sqlalchemy.orm import Session
+from App.db.session import get_db
+from App.services.llm import LLMService, aget_llm_service
+from App.services.media import spool_upload
+from App.repositories import media as media_repo
+from App.client.storage import StorageBackend, aget_storage
 from App.core.dependencies import get_current_user
 from App.schemas.user import UserResponse
 
 router = APIRouter()
-llm_service = LLMService()
-
-
-async def get_storage():
-    return SupabaseStorage()
 
 
 @router.post("/analyze-image")
 async def analyze_image_endpoint(
     file: UploadFile = File(...),
     current_user: UserResponse = Depends(get_current_user),
-    storage: SupabaseStorage = Depends(get_storage)
+    db: Session = Depends(get_db),
+    storage: StorageBackend = Depends(aget_storage),
+    llm: LLMService = Depends(aget_llm_service)
 ):
-    image_bytes = await file.read()
     mime_type = file.content_type
 
-    try:
-        image_url = await run_in_threadpool(
-            storage.upload_image, image_bytes, file.filename, current_user.id
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Image upload failed: {e}")
+    async with spool_upload(file) as upload:
+        # Identical image uploaded before: reuse its stored object and analysis
+        media = await media_repo.get_media_by_hash(db, "image", upload.sha256)
+        if media and media.analysis:
+            await media_repo.link_media_owner(db, media.id, current_user.id, file.filename)
+            return {"analysis": media.analysis, "image_url": media.public_url}
+
+        if not media:
+            try:
+                storage_path, image_url = await storage.aupload_image_object(
+                    upload.path, file.filename, current_user.id
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Image upload failed: {e}")
+            media = await media_repo.create_media(
+                db, "image", upload.sha256, storage_path, image_url, size_bytes=upload.size
+            )
+
+        await media_repo.link_media_owner(db, media.id, current_user.id, file.filename)
+
+        # The vision model needs the image inline, so only this step loads it into memory
+        image_bytes = await run_in_threadpool(upload.read_bytes)
 
     try:
-        result = await llm_service.analyze_image(image_bytes, mime_type)
+        result = await llm.analyze_image(image_bytes, mime_type)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image analysis failed: {e}")
 
-    return {"analysis": result, "image_url": image_url}
\ No newline at end of file
+    await media_repo.set_media_analysis(db, media.id, result)
+
+    return {"analysis": result, "image_url": media.public_url}
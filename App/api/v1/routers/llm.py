@@ -1,53 +1,57 @@
+import codecs
+import json
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 from App.schemas.chat import MessageResponse
 from App.repositories.chat import create_chat, get_chat, create_message, get_messages, delete_chat
 from App.db.session import get_db
-from App.services.llm import LLMService
+from App.services.llm import LLMService, aget_llm_service
 from App.core.dependencies import get_current_user
 from App.schemas.user import UserResponse
 from App.schemas.chat import ChatWithFileResponse
-from App.client.supabase import SupabaseStorage
+from App.client.storage import StorageBackend, aget_storage
+from App.services.media import spool_upload
 
 router = APIRouter(prefix="/llm/chat", tags=["Chat"])
 
 
-async def get_llm_service():
-    return LLMService()
-
-
-async def get_storage():
-    return SupabaseStorage()
-
-
-@router.post("/", response_model=ChatWithFileResponse)
-async def send_or_create_chat(
-    message: str = Form(...),
-    title: str = Form(...),
-    chat_id: UUID | None = Form(None),
-    file: UploadFile | None = File(None),
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    llm: LLMService = Depends(get_llm_service),
-    storage: SupabaseStorage = Depends(get_storage)
-):
+async def _start_turn(
+    db: Session,
+    storage: StorageBackend,
+    current_user: UserResponse,
+    message: str,
+    title: str,
+    chat_id: UUID | None,
+    file: UploadFile | None,
+    storage_path: str | None
+) -> tuple:
+    """Store the attachment and the user message; return (chat, history, file_url)"""
     file_url = None
     file_text_preview = None
 
     if file:
-        file_bytes = await file.read()
-        from fastapi.concurrency import run_in_threadpool
-        file_url = await run_in_threadpool(
-            storage.upload_file, file_bytes, file.filename, current_user.id
-        )
+        async with spool_upload(file) as upload:
+            file_url = await storage.aupload_file(upload.path, file.filename, current_user.id)
+            # 1000 characters are at most 4000 UTF-8 bytes
+            head = await run_in_threadpool(upload.read_head, 4000)
 
         try:
-            file_text_preview = file_bytes.decode("utf-8")[:1000]
+            # Incremental decoder: a character cut off at the end of `head` is not an error
+            file_text_preview = codecs.getincrementaldecoder("utf-8")().decode(head)[:1000]
         except UnicodeDecodeError:
             file_text_preview = f"[File uploaded: {file.filename}]"
 
+    elif storage_path:
+        # File uploaded directly to storage (POST /uploads/presign + /uploads/finalize/chat)
+        if not storage_path.startswith(f"{current_user.id}/") or ".." in storage_path:
+            raise HTTPException(status_code=403, detail="You cannot attach this file")
+        file_url = storage.public_url("chat", storage_path)
+        file_text_preview = f"[File uploaded: {storage_path.rsplit('/', 1)[-1]}]"
+
     chat = await create_chat(db, title=title, owner_id=current_user.id, chat_id=chat_id)
 
     user_msg = message
@@ -56,6 +60,24 @@ async def send_or_create_chat(
     await create_message(db, chat.id, user_msg, "user")
 
     history = [{"role": m.role, "content": m.content} for m in await get_messages(db, chat.id)]
+    return chat, history, file_url
+
+
+@router.post("/", response_model=ChatWithFileResponse)
+async def send_or_create_chat(
+    message: str = Form(...),
+    title: str = Form(...),
+    chat_id: UUID | None = Form(None),
+    file: UploadFile | None = File(None),
+    storage_path: str | None = Form(None),
+    current_user: UserResponse = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    llm: LLMService = Depends(aget_llm_service),
+    storage: StorageBackend = Depends(aget_storage)
+):
+    chat, history, file_url = await _start_turn(
+        db, storage, current_user, message, title, chat_id, file, storage_path
+    )
 
     try:
         ai_reply = await llm.chat(history, file_url=file_url)
@@ -70,6 +92,62 @@ async def send_or_create_chat(
     )
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def stream_chat(
+    message: str = Form(...),
+    title: str = Form(...),
+    chat_id: UUID | None = Form(None),
+    file: UploadFile | None = File(None),
+    storage_path: str | None = Form(None),
+    current_user: UserResponse = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    llm: LLMService = Depends(aget_llm_service),
+    storage: StorageBackend = Depends(aget_storage)
+):
+    """
+    Same as POST /llm/chat/, but the reply is sent as server-sent events:
+    `start` (chat_id, file_url), one `token` per text delta, then `done` with
+    the stored assistant message, or `error` if generation failed. The reply
+    is saved once the stream ends; a partial reply is kept if the client
+    disconnects mid-stream.
+    """
+    chat, history, file_url = await _start_turn(
+        db, storage, current_user, message, title, chat_id, file, storage_path
+    )
+
+    async def events():
+        parts = []
+        saved = False
+        try:
+            yield _sse("start", {"chat_id": str(chat.id), "file_url": file_url})
+            try:
+                async for text in llm.chat_stream(history, file_url=file_url):
+                    parts.append(text)
+                    yield _sse("token", {"text": text})
+            except RuntimeError as e:
+                if not parts:
+                    parts.append("[LLM failed to generate a reply]")
+                yield _sse("error", {"detail": str(e)})
+
+            reply = await create_message(db, chat.id, "".join(parts), "assistant")
+            saved = True
+            yield _sse("done", {"message": MessageResponse.model_validate(reply).model_dump(mode="json")})
+        finally:
+            if not saved and parts:
+                await create_message(db, chat.id, "".join(parts), "assistant")
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{chat_id}/messages", response_model=List[MessageResponse])
 async def get_all_messages(
     chat_id: UUID,
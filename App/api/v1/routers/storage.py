@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from App.client.local import LocalStorage
+from App.client.storage import get_storage
+import os
+
+# Only mounted when STORAGE_BACKEND=local: serves objects and accepts signed direct uploads
+router = APIRouter()
+
+
+@router.put("/local/{bucket}/{file_path:path}", status_code=201)
+async def put_object(bucket: str, file_path: str, expires: int, signature: str, request: Request):
+    if not LocalStorage.verify_signature(bucket, file_path, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload signature")
+
+    storage = get_storage()
+    tmp_path = storage.new_temp_path()
+    try:
+        with open(tmp_path, "wb") as f:
+            async for chunk in request.stream():
+                await run_in_threadpool(f.write, chunk)
+        await run_in_threadpool(storage.commit_temp, bucket, file_path, tmp_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"storage_path": file_path}
+
+
+@router.get("/local/{bucket}/{file_path:path}")
+async def get_object(bucket: str, file_path: str):
+    try:
+        path = get_storage().ref_path(bucket, file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Object not found")
+    return FileResponse(path)
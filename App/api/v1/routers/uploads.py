@@ -0,0 +1,118 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import os
+import tempfile
+from App.db.session import get_db
+from App.client.storage import get_storage
+from App.core.config import settings
+from App.core.dependencies import get_current_user
+from App.repositories import job as job_repo
+from App.repositories import media as media_repo
+from App.schemas.user import UserResponse
+from App.schemas.video import VideoJobResponse
+from App.schemas.upload import (
+    PresignRequest, PresignResponse,
+    FinalizeVideoRequest, FinalizeImageRequest,
+    FinalizeChatFileRequest, FinalizeChatFileResponse
+)
+from App.services.llm import get_llm_service
+from App.services.media import hash_file
+
+# Direct-to-storage uploads: the client PUTs bytes to a signed URL, then calls
+# a finalize endpoint so processing starts from the stored object.
+router = APIRouter()
+
+
+async def _check_stored_object(storage, kind: str, storage_path: str, user_id) -> None:
+    if not storage_path.startswith(f"{user_id}/") or ".." in storage_path:
+        raise HTTPException(status_code=403, detail="You cannot finalize this object")
+    if not await storage.aexists(kind, storage_path):
+        raise HTTPException(status_code=404, detail="Object has not been uploaded")
+
+
+@router.post("/presign", response_model=PresignResponse)
+async def presign_upload(
+    body: PresignRequest,
+    current_user: UserResponse = Depends(get_current_user),
+):
+    storage = get_storage()
+    try:
+        signed = await run_in_threadpool(
+            storage.create_signed_upload, body.kind, body.filename, str(current_user.id)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not create upload URL: {e}")
+    return PresignResponse(kind=body.kind, **signed)
+
+
+@router.post("/finalize/video", response_model=VideoJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def finalize_video(
+    body: FinalizeVideoRequest,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """Queue processing for a directly uploaded video (content dedup happens in the worker)"""
+    storage = get_storage()
+    await _check_stored_object(storage, "video", body.storage_path, current_user.id)
+
+    return await job_repo.create_video_job(
+        db,
+        owner_id=current_user.id,
+        title=body.title,
+        filename=os.path.basename(body.storage_path),
+        storage_path=body.storage_path,
+        video_url=storage.public_url("video", body.storage_path)
+    )
+
+
+@router.post("/finalize/image")
+async def finalize_image(
+    body: FinalizeImageRequest,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    storage = get_storage()
+    await _check_stored_object(storage, "image", body.storage_path, current_user.id)
+    image_url = storage.public_url("image", body.storage_path)
+    filename = os.path.basename(body.storage_path)
+
+    with tempfile.TemporaryDirectory(dir=settings.UPLOAD_SPOOL_DIR) as tmpdir:
+        path = os.path.join(tmpdir, "image")
+        await storage.adownload_to("image", body.storage_path, path)
+        sha256 = await run_in_threadpool(hash_file, path)
+
+        media = await media_repo.get_media_by_hash(db, "image", sha256)
+        if media and media.analysis:
+            await media_repo.link_media_owner(db, media.id, current_user.id, filename)
+            return {"analysis": media.analysis, "image_url": media.public_url}
+        if not media:
+            media = await media_repo.create_media(
+                db, "image", sha256, body.storage_path, image_url, size_bytes=os.path.getsize(path)
+            )
+        await media_repo.link_media_owner(db, media.id, current_user.id, filename)
+
+        with open(path, "rb") as f:
+            image_bytes = await run_in_threadpool(f.read)
+
+    try:
+        result = await get_llm_service().analyze_image(image_bytes, body.mime_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image analysis failed: {e}")
+
+    await media_repo.set_media_analysis(db, media.id, result)
+    return {"analysis": result, "image_url": media.public_url}
+
+
+@router.post("/finalize/chat", response_model=FinalizeChatFileResponse)
+async def finalize_chat_file(
+    body: FinalizeChatFileRequest,
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """Confirm a directly uploaded chat file; pass storage_path to POST /llm/chat/"""
+    storage = get_storage()
+    await _check_stored_object(storage, "chat", body.storage_path, current_user.id)
+    return FinalizeChatFileResponse(
+        storage_path=body.storage_path,
+        file_url=storage.public_url("chat", body.storage_path)
+    )
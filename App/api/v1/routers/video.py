@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
+from uuid import UUID
+import os
+import re
 from App.db.session import get_db
-from App.services.video import VideoService
 from App.repositories import video as video_repo
-from App.schemas.video import VideoResponse
-from App.schemas.video import ChunkResponse, VideoWithChunksResponse
+from App.repositories import job as job_repo
+from App.repositories import media as media_repo
+from App.repositories import upload as upload_repo
+from App.services.media import spool_upload, hash_file, upload_session_path
+from App.client.storage import get_storage
+from App.schemas.video import VideoResponse, VideoJobResponse
+from App.schemas.video import UploadSessionCreate, UploadSessionResponse
+from App.schemas.video import ChunkResponse
 from App.schemas.video import SearchResult
-from App.services.llm import LLMService
+from App.services.llm import LLMService, aget_llm_service
 from App.core.dependencies import get_current_user
 from App.schemas.user import UserResponse
 
 router = APIRouter()
-llm_service = LLMService()
 
 
 # ---------- UPLOAD VIDEO ----------
@@ -20,31 +29,186 @@ llm_service = LLMService()
 
 # App/api/v1/routers/video.py
 
-@router.post("/videos/", response_model=VideoWithChunksResponse)
+@router.post("/videos/", response_model=VideoJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_video(
     title: str = Form(...),
     video_file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: UserResponse = Depends(get_current_user),
 ):
-    file_bytes = await video_file.read()
+    """
+    Store the video and queue it for processing.
+    Transcription, summaries and embeddings run in `python -m App.workers.video`.
+    Content that was uploaded before (same SHA-256) reuses the stored object and,
+    once processed, the existing video instead of being processed again.
+    """
+    async with spool_upload(video_file) as upload:
+        return await _store_and_enqueue(
+            db, current_user.id, title, video_file.filename, upload.path, upload.sha256, upload.size
+        )
 
-    video = await VideoService.upload_and_process_video(
-        db=db,
-        file_bytes=file_bytes,
-        filename=video_file.filename,
+
+async def _store_and_enqueue(db: Session, owner_id: UUID, title: str, filename: str, path: str, sha256: str, size: int):
+    """Upload a local video file to storage (unless already stored) and queue its processing job"""
+    media = await media_repo.get_media_by_hash(db, "video", sha256)
+    if not media:
+        try:
+            storage = get_storage()
+            storage_path, video_url = await storage.aupload_video_object(path, filename, str(owner_id))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Video upload failed: {e}")
+        media = await media_repo.create_media(db, "video", sha256, storage_path, video_url, size_bytes=size)
+
+    await media_repo.link_media_owner(db, media.id, owner_id, filename)
+
+    return await job_repo.create_video_job(
+        db,
+        owner_id=owner_id,
         title=title,
-        user_id=str(current_user.id)
+        filename=filename,
+        storage_path=media.storage_path,
+        video_url=media.public_url,
+        media_id=media.id,
+        video_id=media.video_id
     )
 
-    return VideoWithChunksResponse(
-        id=video.id,
-        title=video.title,
-        description=video.description,  # optional: you can return first chunk summary instead
-        video_url=video.video_url,
-        created_at=video.created_at,
-        chunks=video.chunks
+
+# ---------- RESUMABLE UPLOAD ----------
+#
+# 1. POST  /uploads                 -> session with offset 0
+# 2. PATCH /uploads/{id}            -> body = bytes, header Content-Range: bytes start-end/size
+#    (after a failure, GET /uploads/{id} and continue from `offset`)
+# 3. POST  /uploads/{id}/finalize   -> queues processing like POST /videos/
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+async def _get_own_upload_session(db: Session, session_id: UUID, owner_id: UUID):
+    session = await upload_repo.get_upload_session(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session.owner_id != owner_id:
+        raise HTTPException(status_code=403, detail="You cannot access this upload session")
+    return session
+
+
+def _write_at(path: str, start: int, data: bytes) -> None:
+    with open(path, "r+b") as f:
+        f.seek(start)
+        f.write(data)
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    body: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    session = await upload_repo.create_upload_session(
+        db, owner_id=current_user.id, title=body.title, filename=body.filename, size=body.size
     )
+    open(upload_session_path(session.id), "wb").close()
+    return session
+
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    return await _get_own_upload_session(db, session_id, current_user.id)
+
+
+@router.patch("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def upload_part(
+    session_id: UUID,
+    request: Request,
+    content_range: str = Header(...),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """Write one byte range. Ranges must start at or before the current offset (no gaps)."""
+    session = await _get_own_upload_session(db, session_id, current_user.id)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}")
+
+    match = _CONTENT_RANGE.fullmatch(content_range.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range must be 'bytes start-end/size'")
+    start, end, total = (int(x) for x in match.groups())
+    if total != session.size or end < start or end >= session.size:
+        raise HTTPException(status_code=416, detail=f"Invalid range for upload of {session.size} bytes")
+    if start > session.offset:
+        raise HTTPException(status_code=409, detail=f"Range starts after current offset {session.offset}")
+
+    path = upload_session_path(session.id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Upload part file is missing, start a new session")
+
+    # Stream the body to disk; whatever arrived before a disconnect still counts
+    position = start
+    try:
+        async for chunk in request.stream():
+            if position + len(chunk) > end + 1:
+                raise HTTPException(status_code=400, detail="Body is longer than Content-Range")
+            await run_in_threadpool(_write_at, path, position, chunk)
+            position += len(chunk)
+    except ClientDisconnect:
+        pass
+    finally:
+        session = await upload_repo.advance_upload_session(db, session.id, position)
+
+    return session
+
+
+@router.post("/uploads/{session_id}/finalize", response_model=VideoJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def finalize_upload(
+    session_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    session = await _get_own_upload_session(db, session_id, current_user.id)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}")
+    if session.offset < session.size:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {session.offset}/{session.size} bytes received")
+
+    # Only one concurrent finalize gets past this; the part file is then ours alone
+    if not await upload_repo.claim_upload_session(db, session.id):
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+    path = upload_session_path(session.id)
+    try:
+        if not os.path.exists(path):
+            raise HTTPException(status_code=410, detail="Upload part file is missing, start a new session")
+        sha256 = await run_in_threadpool(hash_file, path)
+        job = await _store_and_enqueue(
+            db, current_user.id, session.title, session.filename, path, sha256, session.size
+        )
+    except Exception:
+        db.rollback()
+        await upload_repo.reopen_upload_session(db, session.id)
+        raise
+    await upload_repo.finalize_upload_session(db, session.id, job.id)
+    os.remove(path)
+    return job
+
+
+# ---------- JOB STATUS ----------
+
+@router.get("/jobs/{job_id}", response_model=VideoJobResponse)
+async def get_video_job(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    job = await job_repo.get_video_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You cannot view this job")
+    return job
 
 
 # ---------- GET ALL VIDEOS ----------
@@ -77,21 +241,17 @@ async def get_chunk(chunk_id: str, db: Session = Depends(get_db)):
 # ---------- SEARCH ----------
 
 @router.get("/search", response_model=list[SearchResult])
-async def search(query: str, top_k: int = 5, db: Session = Depends(get_db)):
-    emb = await llm_service.emb([query])
+async def search(
+    query: str,
+    top_k: int = Query(5, ge=1, le=100),
+    ef_search: int | None = Query(None, ge=1, le=1000, description="HNSW recall/latency trade-off"),
+    probes: int | None = Query(None, ge=1, description="IVFFlat recall/latency trade-off"),
+    db: Session = Depends(get_db),
+    llm: LLMService = Depends(aget_llm_service)
+):
+    emb = await llm.emb([query])
     query_vector = emb[0]
-    results = await video_repo.search_similar_chunks(db, query_vector, top_k)
-
-    # convert raw rows into SearchResult
-    response = []
-    for r in results:
-        response.append(SearchResult(
-            chunk_id=r.id,
-            video_id=r.video_id,
-            title=r.video.title,
-            summary=r.summary,
-            similarity_score=0.0,  # optional: calculate cosine if needed
-            start_time=r.start_time,
-            end_time=r.end_time
-        ))
-    return response
\ No newline at end of file
+    results = await video_repo.search_similar_chunks(
+        db, query_vector, top_k, ef_search=ef_search, probes=probes
+    )
+    return [SearchResult(**row) for row in results]
\ No newline at end of file
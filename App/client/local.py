@@ -0,0 +1,148 @@
+from typing import Optional
+from urllib.parse import quote
+from App.core.config import settings
+from App.client.storage import StorageBackend
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class LocalStorage(StorageBackend):
+    """
+    Content-addressed filesystem backend.
+
+    Bytes are stored once per SHA-256 under LOCAL_STORAGE_DIR/objects/ab/<sha256>.
+    Every storage path (LOCAL_STORAGE_DIR/<bucket>/<path>) is a hard link to its
+    blob, so identical uploads share disk space. Ingestion workers on the same
+    machine read objects in place via local_path() instead of downloading them.
+    Objects are served, and signed direct uploads accepted, by /storage/local.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.root = os.path.abspath(settings.LOCAL_STORAGE_DIR)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    # ---------- paths & signatures ----------
+
+    def ref_path(self, bucket: str, file_path: str) -> str:
+        if bucket not in self.buckets.values():
+            raise ValueError("Unknown bucket")
+        bucket_root = os.path.join(self.root, bucket)
+        full = os.path.abspath(os.path.join(bucket_root, file_path))
+        if not full.startswith(bucket_root + os.sep):
+            raise ValueError("Invalid storage path")
+        return full
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    @staticmethod
+    def _signature(bucket: str, file_path: str, expires: int) -> str:
+        message = f"{bucket}/{file_path}:{expires}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def verify_signature(bucket: str, file_path: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        expected = LocalStorage._signature(bucket, file_path, expires)
+        return hmac.compare_digest(expected, signature)
+
+    def _object_url(self, bucket: str, file_path: str) -> str:
+        # file_path holds the client's filename: '#', '?', '%' or spaces must not end the path
+        return f"{settings.PUBLIC_BASE_URL.rstrip('/')}/storage/local/{bucket}/{quote(file_path)}"
+
+    # ---------- content-addressed writes ----------
+
+    def new_temp_path(self) -> str:
+        """Temp file on the storage filesystem, to be passed to commit_temp()"""
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir)
+        os.close(fd)
+        return path
+
+    def commit_temp(self, bucket: str, file_path: str, tmp_path: str) -> str:
+        """Move a finished temp file into the blob store and link it at bucket/file_path"""
+        digest = hashlib.sha256()
+        with open(tmp_path, "rb") as f:
+            while chunk := f.read(COPY_CHUNK_SIZE):
+                digest.update(chunk)
+        blob = self.blob_path(digest.hexdigest())
+
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if os.path.exists(blob):
+            os.remove(tmp_path)  # same content already stored
+        else:
+            os.replace(tmp_path, blob)
+
+        ref = self.ref_path(bucket, file_path)
+        os.makedirs(os.path.dirname(ref), exist_ok=True)
+        if os.path.exists(ref):
+            os.remove(ref)
+        os.link(blob, ref)
+        return ref
+
+    def _put(self, bucket: str, file_path: str, source: bytes | str) -> None:
+        tmp_path = self.new_temp_path()
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                with open(tmp_path, "wb") as f:
+                    f.write(source)
+            else:
+                shutil.copyfile(source, tmp_path)
+            self.commit_temp(bucket, file_path, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def upload_video_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
+        self._put(self.video_bucket, file_path, source)
+        return file_path, self._object_url(self.video_bucket, file_path)
+
+    def upload_file(self, source: bytes | str, filename: str, user_id: str) -> str:
+        file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
+        self._put(self.chat_bucket, file_path, source)
+        return self._object_url(self.chat_bucket, file_path)
+
+    def upload_image_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        file_path = f"{user_id}/{filename}"
+        self._put(self.image_bucket, file_path, source)
+        return file_path, self._object_url(self.image_bucket, file_path)
+
+    # ---------- reads ----------
+
+    def download_to(self, kind: str, file_path: str, dest_path: str) -> None:
+        shutil.copyfile(self.ref_path(self.buckets[kind], file_path), dest_path)
+
+    def local_path(self, kind: str, file_path: str) -> Optional[str]:
+        path = self.ref_path(self.buckets[kind], file_path)
+        return path if os.path.isfile(path) else None
+
+    def public_url(self, kind: str, file_path: str) -> str:
+        return self._object_url(self.buckets[kind], file_path)
+
+    def exists(self, kind: str, file_path: str) -> bool:
+        return os.path.isfile(self.ref_path(self.buckets[kind], file_path))
+
+    # ---------- direct (presigned) uploads ----------
+
+    def create_signed_upload(self, kind: str, filename: str, user_id: str) -> dict:
+        bucket = self.buckets[kind]
+        file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
+        expires = int(time.time()) + settings.SIGNED_UPLOAD_EXPIRES_SECONDS
+        signature = self._signature(bucket, file_path, expires)
+        return {
+            "storage_path": file_path,
+            "upload_url": f"{self._object_url(bucket, file_path)}?expires={expires}&signature={signature}",
+            "token": signature,
+        }
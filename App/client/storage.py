@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+from App.core.config import settings
+import asyncio
+
+
+class StorageBackend(ABC):
+    """
+    Object storage used for uploaded media.
+    Upload methods take either the raw bytes or the path of a local file.
+
+    The `a`-prefixed methods are the async API used on the request path.
+    By default they run the blocking method in a worker thread; backends
+    with a native async client override them.
+    """
+
+    def __init__(self):
+        self.chat_bucket = settings.SUPABASE_BUCKET
+        self.video_bucket = settings.SUPABASE_VIDEO_BUCKET
+        self.image_bucket = settings.SUPABASE_IMAGE_BUCKET
+        self.buckets = {
+            "video": self.video_bucket,
+            "chat": self.chat_bucket,
+            "image": self.image_bucket,
+        }
+
+    # ---------- uploads ----------
+
+    @abstractmethod
+    def upload_video_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        """Upload a video and return (storage path, public url)"""
+
+    @abstractmethod
+    def upload_image_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        """Upload an image and return (storage path, public url)"""
+
+    @abstractmethod
+    def upload_file(self, source: bytes | str, filename: str, user_id: str) -> str:
+        """Upload a chat file and return its public url"""
+
+    def upload_video(self, source: bytes | str, filename: str, user_id: str) -> str:
+        _, public_url = self.upload_video_object(source, filename, user_id)
+        return public_url
+
+    def upload_image(self, source: bytes | str, filename: str, user_id: str) -> str:
+        _, public_url = self.upload_image_object(source, filename, user_id)
+        return public_url
+
+    # ---------- reads ----------
+
+    @abstractmethod
+    def download_to(self, kind: str, file_path: str, dest_path: str) -> None:
+        """Copy a stored object to a local file"""
+
+    @abstractmethod
+    def public_url(self, kind: str, file_path: str) -> str:
+        ...
+
+    @abstractmethod
+    def exists(self, kind: str, file_path: str) -> bool:
+        ...
+
+    def local_path(self, kind: str, file_path: str) -> Optional[str]:
+        """Path of the object on this machine's disk, if it can be read without a download"""
+        return None
+
+    # ---------- async API ----------
+
+    async def aupload_video_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        return await asyncio.to_thread(self.upload_video_object, source, filename, user_id)
+
+    async def aupload_image_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        return await asyncio.to_thread(self.upload_image_object, source, filename, user_id)
+
+    async def aupload_file(self, source: bytes | str, filename: str, user_id: str) -> str:
+        return await asyncio.to_thread(self.upload_file, source, filename, user_id)
+
+    async def aupload_video(self, source: bytes | str, filename: str, user_id: str) -> str:
+        _, public_url = await self.aupload_video_object(source, filename, user_id)
+        return public_url
+
+    async def adownload_to(self, kind: str, file_path: str, dest_path: str) -> None:
+        await asyncio.to_thread(self.download_to, kind, file_path, dest_path)
+
+    async def aexists(self, kind: str, file_path: str) -> bool:
+        return await asyncio.to_thread(self.exists, kind, file_path)
+
+    async def aclose(self) -> None:
+        """Release pooled connections"""
+
+    # ---------- direct (presigned) uploads ----------
+
+    @abstractmethod
+    def create_signed_upload(self, kind: str, filename: str, user_id: str) -> dict:
+        """
+        Reserve a storage path under the user's folder and return a URL the
+        client can upload to directly: {"storage_path", "upload_url", "token"}.
+        """
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def create_storage() -> StorageBackend:
+    """New storage backend selected by STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "local":
+        from App.client.local import LocalStorage
+        return LocalStorage()
+    from App.client.supabase import SupabaseStorage
+    return SupabaseStorage()
+
+
+def get_storage() -> StorageBackend:
+    """
+    Process-wide storage backend. Created once (in the app lifespan, or on
+    first use in workers) so every request reuses its pooled connections.
+    """
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+async def aget_storage() -> StorageBackend:
+    """get_storage as a FastAPI dependency: async, so it does not take a threadpool slot"""
+    return get_storage()
+
+
+async def close_storage() -> None:
+    global _storage
+    if _storage is not None:
+        await _storage.aclose()
+        _storage = None
@@ -1,42 +1,175 @@
+from contextlib import contextmanager
+from typing import AsyncIterator
+from urllib.parse import quote
 from supabase import create_client, Client
 from App.core.config import settings
+from App.client.storage import StorageBackend
+import asyncio
+import httpx
+import os
 import uuid
 
-class SupabaseStorage:
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class SupabaseStorage(StorageBackend):
+    """
+    Supabase Storage backend. A local path is sent as an open file handle, so
+    large uploads are streamed from disk instead of being held in memory.
+
+    One instance is shared per process (see get_storage). The async methods
+    talk to the Storage REST API through a single httpx.AsyncClient whose
+    keep-alive pool is reused across requests, so uploads neither occupy a
+    threadpool slot nor pay a TLS handshake each time.
+    """
+
     def __init__(self):
+        super().__init__()
         self.client: Client = create_client(
             settings.SUPABASE_URL,
             settings.SUPABASE_KEY
         )
-        self.chat_bucket = settings.SUPABASE_BUCKET
-        self.video_bucket = settings.SUPABASE_VIDEO_BUCKET
-        self.image_bucket = settings.SUPABASE_IMAGE_BUCKET
+        self.http = httpx.AsyncClient(
+            base_url=f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1",
+            headers={
+                "apikey": settings.SUPABASE_KEY,
+                "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+            },
+            limits=httpx.Limits(
+                max_connections=settings.STORAGE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.STORAGE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.STORAGE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.STORAGE_TIMEOUT_SECONDS, connect=10.0),
+        )
+
+    @staticmethod
+    @contextmanager
+    def _payload(source: bytes | str):
+        if isinstance(source, (bytes, bytearray)):
+            yield source
+        else:
+            with open(source, "rb") as f:
+                yield f
 
-    def upload_video(self, file_bytes: bytes, filename: str, user_id: str) -> str:
+    def upload_video_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
         file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
 
-        self.client.storage.from_(self.video_bucket).upload(
-            file_path,
-            file_bytes,
-            {"content-type": "video/mp4"}
-        )
+        with self._payload(source) as payload:
+            self.client.storage.from_(self.video_bucket).upload(
+                file_path,
+                payload,
+                {"content-type": "video/mp4"}
+            )
 
-        return self.client.storage.from_(self.video_bucket).get_public_url(file_path)
+        return file_path, self.client.storage.from_(self.video_bucket).get_public_url(file_path)
 
-    def upload_file(self, file_bytes: bytes, filename: str, user_id: str) -> str:
+    def upload_file(self, source: bytes | str, filename: str, user_id: str) -> str:
         file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
 
-        self.client.storage.from_(self.chat_bucket).upload(file_path, file_bytes)
+        with self._payload(source) as payload:
+            self.client.storage.from_(self.chat_bucket).upload(file_path, payload)
 
         return self.client.storage.from_(self.chat_bucket).get_public_url(file_path)
 
-    def upload_image(self, file_bytes: bytes, filename: str, user_id: str) -> str:
+    def upload_image_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
         file_path = f"{user_id}/{filename}"
 
-        self.client.storage.from_(self.image_bucket).upload(
-            file_path,
-            file_bytes,
-            {"content-type": "image/jpeg"}
+        with self._payload(source) as payload:
+            self.client.storage.from_(self.image_bucket).upload(
+                file_path,
+                payload,
+                {"content-type": "image/jpeg"}
+            )
+
+        return file_path, self.client.storage.from_(self.image_bucket).get_public_url(file_path)
+
+    def download_to(self, kind: str, file_path: str, dest_path: str) -> None:
+        """Stream a stored object to a local file in bounded chunks"""
+        signed = self.client.storage.from_(self.buckets[kind]).create_signed_url(file_path, 3600)
+        url = signed.get("signedURL") or signed.get("signedUrl")
+
+        with httpx.stream("GET", url, follow_redirects=True, timeout=None) as response:
+            response.raise_for_status()
+            with open(dest_path, "wb") as f:
+                for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+
+    def public_url(self, kind: str, file_path: str) -> str:
+        return self.client.storage.from_(self.buckets[kind]).get_public_url(file_path)
+
+    def exists(self, kind: str, file_path: str) -> bool:
+        folder, _, name = file_path.rpartition("/")
+        entries = self.client.storage.from_(self.buckets[kind]).list(folder, {"search": name})
+        return any(entry.get("name") == name for entry in entries)
+
+    def create_signed_upload(self, kind: str, filename: str, user_id: str) -> dict:
+        file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
+        signed = self.client.storage.from_(self.buckets[kind]).create_signed_upload_url(file_path)
+        return {
+            "storage_path": file_path,
+            "upload_url": signed.get("signed_url") or signed.get("signedUrl"),
+            "token": signed.get("token"),
+        }
+
+    # ---------- async API (pooled httpx client) ----------
+
+    @staticmethod
+    def _object_route(bucket: str, file_path: str) -> str:
+        return f"/object/{bucket}/{quote(file_path)}"
+
+    @staticmethod
+    async def _file_chunks(path: str) -> AsyncIterator[bytes]:
+        with open(path, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    async def _aput(self, bucket: str, file_path: str, source: bytes | str, content_type: str | None = None) -> None:
+        headers = {"x-upsert": "false"}
+        if content_type:
+            headers["content-type"] = content_type
+        if isinstance(source, (bytes, bytearray)):
+            content = bytes(source)
+        else:
+            # Explicit length so the body streams from disk without chunked encoding
+            headers["content-length"] = str(os.path.getsize(source))
+            content = self._file_chunks(source)
+
+        response = await self.http.post(self._object_route(bucket, file_path), content=content, headers=headers)
+        response.raise_for_status()
+
+    async def aupload_video_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
+        await self._aput(self.video_bucket, file_path, source, "video/mp4")
+        return file_path, self.public_url("video", file_path)
+
+    async def aupload_image_object(self, source: bytes | str, filename: str, user_id: str) -> tuple[str, str]:
+        file_path = f"{user_id}/{filename}"
+        await self._aput(self.image_bucket, file_path, source, "image/jpeg")
+        return file_path, self.public_url("image", file_path)
+
+    async def aupload_file(self, source: bytes | str, filename: str, user_id: str) -> str:
+        file_path = f"{user_id}/{uuid.uuid4()}_{filename}"
+        await self._aput(self.chat_bucket, file_path, source)
+        return self.public_url("chat", file_path)
+
+    async def adownload_to(self, kind: str, file_path: str, dest_path: str) -> None:
+        route = self._object_route(self.buckets[kind], file_path)
+        async with self.http.stream("GET", route) as response:
+            response.raise_for_status()
+            with open(dest_path, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(f.write, chunk)
+
+    async def aexists(self, kind: str, file_path: str) -> bool:
+        folder, _, name = file_path.rpartition("/")
+        response = await self.http.post(
+            f"/object/list/{self.buckets[kind]}",
+            json={"prefix": folder, "search": name, "limit": 100, "offset": 0}
         )
+        response.raise_for_status()
+        return any(entry.get("name") == name for entry in response.json())
 
-        return self.client.storage.from_(self.image_bucket).get_public_url(file_path)
\ No newline at end of file
+    async def aclose(self) -> None:
+        await self.http.aclose()
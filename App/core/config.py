@@ -12,6 +12,19 @@ class Settings(BaseSettings):
     LLM_MODEL: str = "command-r-08-2024"
     VISION_MODEL: str ="command-a-vision-07-2025"
     EMB_MODEL: str = "embed-v4.0"
+    EMB_BATCH_SIZE: int = 96  # Cohere embed limit per request
+    EMB_MAX_CONCURRENCY: int = 4
+    SUMMARY_MAX_CONCURRENCY: int = 8
+    SUMMARY_MAX_RETRIES: int = 4
+    SUMMARY_RETRY_BASE_SECONDS: float = 1.0  # backoff before retry n is up to base * 2^(n-1), with jitter
+    SUMMARY_RETRY_MAX_SECONDS: float = 30.0
+    SUMMARY_CHUNKS_PER_REQUEST: int = 10  # 1 = one LLM call per chunk
+    DESCRIPTION_REDUCE_FANOUT: int = 40  # chunk summaries merged per reduce prompt
+    # Shared Cohere HTTP pool (one per process); caps concurrent LLM requests
+    LLM_MAX_CONNECTIONS: int = 50
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_TIMEOUT_SECONDS: float = 300.0
 
     
     SECRET_KEY: str
@@ -25,6 +38,70 @@ class Settings(BaseSettings):
     SUPABASE_VIDEO_BUCKET: str = "video"
     SUPABASE_IMAGE_BUCKET: str = "images"
 
+    # Object storage: "supabase", or "local" (filesystem stand-in served by /storage/local)
+    STORAGE_BACKEND: Literal["supabase", "local"] = "supabase"
+    LOCAL_STORAGE_DIR: str = "storage"
+    PUBLIC_BASE_URL: str = "http://localhost:8000"
+    SIGNED_UPLOAD_EXPIRES_SECONDS: int = 3600
+    # Shared storage HTTP pool (one per process, created in the app lifespan)
+    STORAGE_MAX_CONNECTIONS: int = 20
+    STORAGE_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    STORAGE_KEEPALIVE_EXPIRY: float = 30.0
+    STORAGE_TIMEOUT_SECONDS: float = 300.0
+
+    # Transcription
+    TRANSCRIBE_BACKEND: Literal["whisper", "faster-whisper"] = "whisper"
+    WHISPER_MODEL: str = "base"
+    WHISPER_COMPUTE_TYPE: str = "int8"  # faster-whisper only: int8, int8_float32, float32
+    WHISPER_CPU_THREADS: int = 0  # per transcription process, 0 = CPU cores / TRANSCRIBE_WORKERS
+    TRANSCRIBE_WORKERS: int = 0  # pool processes, 0 = one per 4 CPU cores
+    TRANSCRIBE_WINDOW_SECONDS: float = 300.0
+    TRANSCRIBE_WINDOW_OVERLAP_SECONDS: float = 10.0
+    # Drop non-speech before transcription; off until validated on your content
+    VAD_ENABLED: bool = False
+    VAD_METHOD: Literal["silero", "energy"] = "silero"  # silero needs faster-whisper; energy keeps music
+    VAD_SPEECH_THRESHOLD: float = 0.5  # silero: speech probability
+    VAD_RELATIVE_THRESHOLD_DB: float = -35.0  # energy: frames this far below the file's loud level are silence
+    VAD_MIN_SILENCE_SECONDS: float = 1.0  # shorter pauses are kept
+    VAD_PADDING_SECONDS: float = 0.2
+
+    # Where uploads are spooled to disk (None = system temp dir)
+    UPLOAD_SPOOL_DIR: Optional[str] = None
+    # Part files of resumable uploads (None = <temp dir>/video-uploads); must survive restarts
+    UPLOAD_SESSION_DIR: Optional[str] = None
+    UPLOAD_SESSION_EXPIRE_SECONDS: int = 86400  # sessions (and part files) idle this long are discarded
+    UPLOAD_SESSION_CLEANUP_SECONDS: float = 3600.0
+
+    # Chunk batches at least this large are written with COPY instead of executemany
+    CHUNK_COPY_THRESHOLD: int = 500
+
+    # ANN indexes on video_chunks.embedding and embeddings.vector
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat", "none"] = "hnsw"
+    # Build them in the background at API startup; off = run `python -m App.db.indexes` instead
+    VECTOR_INDEX_AUTO_BUILD: bool = True
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 40  # default per query; higher = better recall, slower
+    IVFFLAT_LISTS: int = 100  # roughly rows / 1000; the index is built once a table holds lists * 1000 rows
+    IVFFLAT_PROBES: int = 10  # default per query; higher = better recall, slower
+    # Compact vectors for candidate search, re-ranked exactly against the full vectors:
+    # none, halfvec (2x smaller), int8 (4x, local index only; pgvector uses halfvec) or binary (32x)
+    VECTOR_QUANTIZATION: Literal["none", "halfvec", "int8", "binary"] = "none"
+    VECTOR_RERANK_FACTOR: int = 4  # candidates per result; binary usually needs 10+
+    # /embedding/similarity keeps the corpus in memory; full reload picks up other processes' writes
+    SIMILARITY_REFRESH_SECONDS: float = 300.0
+
+    # Memory-mapped vector index on local disk, searched instead of pgvector (single node)
+    LOCAL_VECTOR_INDEX: bool = False
+    LOCAL_VECTOR_INDEX_DIR: str = "vector_index"
+    LOCAL_VECTOR_INDEX_COMPACT_SECONDS: float = 30.0  # background compaction interval
+
+    # Video ingestion worker
+    VIDEO_JOB_POLL_INTERVAL: float = 2.0
+    VIDEO_JOB_MAX_ATTEMPTS: int = 3
+    VIDEO_JOB_STALE_AFTER_SECONDS: int = 600  # reclaim 'processing' jobs whose heartbeat is older
+    VIDEO_JOB_HEARTBEAT_SECONDS: float = 60.0  # running jobs refresh locked_at this often
+
     class Config:
         env_file = ".env"
 
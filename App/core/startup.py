@@ -0,0 +1,72 @@
+"""
+Boot-time diagnostics: per-module import timing and memory.
+
+API processes must never import the ML stack (Whisper, torch, moviepy);
+those are only loaded inside transcription pool processes of the video
+worker. report() warns if one of them slipped into the API import graph.
+"""
+import builtins
+import importlib.util
+import logging
+import resource
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+HEAVY_MODULES = ("torch", "whisper", "faster_whisper", "ctranslate2", "moviepy")
+
+
+class ImportTimer:
+    """
+    Records the cumulative import time of every module first imported inside
+    the `with` block (like `python -X importtime`, but logged at boot).
+    """
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self.total = 0.0
+        self._original_import = None
+        self._started = 0.0
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level:
+            try:
+                resolved = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                resolved = name
+        else:
+            resolved = name
+
+        if resolved in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self.timings.setdefault(resolved, time.perf_counter() - start)
+
+    def __enter__(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total = time.perf_counter() - self._started
+        builtins.__import__ = self._original_import
+        return False
+
+    def report(self, top: int = 15) -> None:
+        slowest = sorted(self.timings.items(), key=lambda item: -item[1])[:top]
+        # ru_maxrss is KiB on Linux
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        logger.info(f"Imports took {self.total * 1000:.0f} ms, peak RSS {rss_mb:.0f} MB")
+        for module, seconds in slowest:
+            logger.info(f"  import {module}: {seconds * 1000:.1f} ms")
+
+        loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        if loaded:
+            logger.warning(f"Heavy ML modules imported in API process: {', '.join(loaded)}")
@@ -0,0 +1,212 @@
+# App/db/indexes.py
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from App.core.config import settings
+import argparse
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (table, vector column) pairs that get an ANN index. Searches order by L2
+# distance (<->), so full-precision indexes use the vector_l2_ops class.
+VECTOR_COLUMNS = [
+    ("video_chunks", "embedding"),
+    ("embeddings", "vector"),
+]
+VECTOR_DIM = 1536
+INDEX_TYPES = ("hnsw", "ivfflat")
+HNSW_MAX_EF_SEARCH = 1000  # pgvector limit
+IVFFLAT_ROWS_PER_LIST = 1000  # pgvector guidance: lists ~ rows / 1000
+ADVISORY_LOCK_KEY = 0x76656374  # pg_advisory_lock key serializing index management
+
+# Compact form the ANN index is built on: (SQL expression of a vector, operator class, distance operator).
+# The table keeps full vectors, so candidates are re-ranked exactly.
+QUANTIZED_FORMS = {
+    "none": ("{}", "vector_l2_ops", "<->"),
+    "halfvec": (f"({{}})::halfvec({VECTOR_DIM})", "halfvec_l2_ops", "<->"),
+    "binary": (f"binary_quantize({{}})::bit({VECTOR_DIM})", "bit_hamming_ops", "<~>"),
+}
+
+
+def sql_quantization() -> str:
+    """VECTOR_QUANTIZATION as pgvector can index it; it has no int8 type, so int8 uses halfvec"""
+    if settings.VECTOR_QUANTIZATION == "int8":
+        return "halfvec"
+    return settings.VECTOR_QUANTIZATION
+
+
+def candidate_order(column: str, query: str) -> str:
+    """ORDER BY expression that lets the ANN index pick candidates for `query`"""
+    expression, _, operator = QUANTIZED_FORMS[sql_quantization()]
+    return f"{expression.format(column)} {operator} {expression.format(query)}"
+
+
+def _index_name(table: str, column: str, index_type: str, quantization: str) -> str:
+    suffix = "" if quantization == "none" else f"_{quantization}"
+    return f"ix_{table}_{column}_{index_type}{suffix}"
+
+
+def _index_ddl(table: str, column: str, index_type: str, quantization: str) -> str:
+    name = _index_name(table, column, index_type, quantization)
+    expression, ops, _ = QUANTIZED_FORMS[quantization]
+    key = column if quantization == "none" else f"({expression.format(column)})"
+    if index_type == "hnsw":
+        params = f"m = {int(settings.HNSW_M)}, ef_construction = {int(settings.HNSW_EF_CONSTRUCTION)}"
+    else:
+        params = f"lists = {int(settings.IVFFLAT_LISTS)}"
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} "
+        f"USING {index_type} ({key} {ops}) WITH ({params})"
+    )
+
+
+def _index_valid(conn, name: str) -> bool | None:
+    """indisvalid of an index, None if it does not exist"""
+    return conn.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name}
+    ).scalar()
+
+
+def _build_in_progress(conn, table: str) -> bool:
+    """Whether any session is building an index on `table` right now"""
+    return conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_stat_progress_create_index WHERE relid = CAST(:table AS regclass))"),
+        {"table": table}
+    ).scalar()
+
+
+def _has_rows(conn, table: str, count: int) -> bool:
+    return conn.execute(text(f"SELECT count(*) FROM (SELECT 1 FROM {table} LIMIT :n) s"), {"n": count}).scalar() >= count
+
+
+def _ensure_index(conn, table: str, column: str, quantization: str, rebuild: bool) -> None:
+    index_type = settings.VECTOR_INDEX_TYPE
+    name = _index_name(table, column, index_type, quantization)
+    valid = _index_valid(conn, name)
+
+    # Invalid is also the state of an index while CREATE INDEX CONCURRENTLY runs
+    if valid is False and _build_in_progress(conn, table):
+        logger.info(f"Index {name} is being built by another session, leaving it")
+        return
+    if valid and not rebuild:
+        return
+
+    if valid is False:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        valid = None
+
+    if index_type == "ivfflat":
+        # IVFFlat trains its list centroids on the rows present at build time
+        min_rows = settings.IVFFLAT_LISTS * IVFFLAT_ROWS_PER_LIST
+        if not _has_rows(conn, table, min_rows):
+            logger.info(f"Deferring ivfflat index {name} until {table} holds {min_rows} rows (exact scans until then)")
+            return
+
+    if valid:
+        logger.info(f"Dropping {name} to rebuild it")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    logger.info(f"Building {index_type} ({quantization}) index on {table}.{column}")
+    conn.execute(text(_index_ddl(table, column, index_type, quantization)))
+    logger.info(f"Index {name} ready")
+
+
+def ensure_vector_indexes(engine: Engine, rebuild: bool = False) -> None:
+    """
+    Create the ANN index selected by VECTOR_INDEX_TYPE and VECTOR_QUANTIZATION
+    on every vector column and drop the other variants, so switching is a
+    restart. Build parameters only apply when an index is created; `rebuild`
+    drops and recreates it. Indexes are built and dropped CONCURRENTLY so
+    writes to the tables are not blocked meanwhile; that cannot run in a
+    transaction, hence the AUTOCOMMIT connection. A session advisory lock
+    lets one process at a time do this; the others skip it.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    quantization = sql_quantization()
+    if quantization != settings.VECTOR_QUANTIZATION:
+        logger.warning(f"pgvector has no {settings.VECTOR_QUANTIZATION} type, indexing {quantization} instead")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+            logger.info("Vector indexes are managed by another process, skipping")
+            return
+        try:
+            for table, column in VECTOR_COLUMNS:
+                for index_type in INDEX_TYPES:
+                    for form in QUANTIZED_FORMS:
+                        if (index_type, form) != (settings.VECTOR_INDEX_TYPE, quantization):
+                            conn.execute(text(
+                                f"DROP INDEX CONCURRENTLY IF EXISTS {_index_name(table, column, index_type, form)}"
+                            ))
+                if settings.VECTOR_INDEX_TYPE in INDEX_TYPES:
+                    _ensure_index(conn, table, column, quantization, rebuild)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+def start_vector_index_build(engine: Engine) -> threading.Thread:
+    """
+    Run ensure_vector_indexes in a daemon thread, so a long HNSW build never
+    holds up startup (or its readiness probe). Searches use exact scans until
+    the index is valid.
+    """
+    def _run():
+        try:
+            ensure_vector_indexes(engine)
+        except Exception as e:
+            logger.error(f"Vector index build failed: {e}")
+
+    thread = threading.Thread(target=_run, name="vector-index-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def set_search_params(
+    db: Session,
+    top_k: int,
+    ef_search: int | None = None,
+    probes: int | None = None
+) -> None:
+    """
+    Tune recall for the ANN search that follows, for the current transaction
+    only. HNSW returns at most ef_search rows, so it is never set below top_k.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        value = min(max(ef_search or settings.HNSW_EF_SEARCH, top_k), HNSW_MAX_EF_SEARCH)
+        db.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(value)})
+    elif settings.VECTOR_INDEX_TYPE == "ivfflat":
+        value = probes or settings.IVFFLAT_PROBES
+        db.execute(text("SELECT set_config('ivfflat.probes', :value, true)"), {"value": str(value)})
+
+
+def disable_index_scans(db: Session) -> None:
+    """Force exact (sequential) vector ordering for the rest of the transaction"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+
+
+def main() -> None:
+    """One-shot index management, e.g. with VECTOR_INDEX_AUTO_BUILD off or to retrain IVFFlat lists"""
+    parser = argparse.ArgumentParser(description="Create or rebuild the ANN vector indexes")
+    parser.add_argument("--rebuild", action="store_true", help="drop and rebuild the selected indexes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    from App.db.session import engine, supabase_engine
+    if settings.DB_MODE in ["local", "both"]:
+        ensure_vector_indexes(engine, rebuild=args.rebuild)
+    if settings.DB_MODE in ["supabase", "both"] and supabase_engine:
+        ensure_vector_indexes(supabase_engine, rebuild=args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
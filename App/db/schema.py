@@ -0,0 +1,25 @@
+# App/db/schema.py
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Column changes to tables that create_all() does not alter once they exist.
+# Every statement must be idempotent: it runs on each startup.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS duration DOUBLE PRECISION",
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS skipped_audio_seconds DOUBLE PRECISION",
+]
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Bring tables created by older versions up to the current models (run after create_all)"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+    logger.info(f"Schema upgrades applied ({len(SCHEMA_UPGRADES)} statements)")
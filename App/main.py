@@ -1,23 +1,67 @@
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from App.db.session import engine, supabase_engine
-from App.db.base import Base
-from App.core.config import settings
-from App.api.v1.routers import llm, users, items, admin, img, embeddings, video
-from fastapi.middleware.cors import CORSMiddleware
+from App.core.startup import ImportTimer
+
+with ImportTimer() as import_timer:
+    import asyncio
+    from contextlib import asynccontextmanager, suppress
+    from fastapi import FastAPI
+    from App.db.session import engine, supabase_engine, SessionLocal, SupabaseSession
+    from App.db.base import Base
+    from App.db.schema import upgrade_schema
+    from App.db.indexes import start_vector_index_build
+    from App.services.vector_index import backfill_vector_indexes, compact_periodically
+    from App.core.config import settings
+    from App.client.storage import get_storage, close_storage
+    from App.services.llm import get_llm_service, close_llm_service
+    from App.services.media import cleanup_upload_sessions_periodically
+    from App.api.v1.routers import llm, users, items, admin, img, embeddings, video, uploads
+    from fastapi.middleware.cors import CORSMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create tables
+    import_timer.report()
+
+    # Startup: create tables, add columns newer than existing tables,
+    # ANN vector indexes (built in the background; one process at a time)
     if settings.DB_MODE in ["local", "both"]:
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
+        if settings.VECTOR_INDEX_AUTO_BUILD:
+            start_vector_index_build(engine)
 
     if settings.DB_MODE in ["supabase", "both"] and supabase_engine:
         Base.metadata.create_all(bind=supabase_engine)
+        upgrade_schema(supabase_engine)
+        if settings.VECTOR_INDEX_AUTO_BUILD:
+            start_vector_index_build(supabase_engine)
+
+    primary = SupabaseSession if settings.DB_MODE == "supabase" else SessionLocal
+
+    # Local vector index: fill it from the primary database the first time it is enabled,
+    # then keep merging small segments in the background
+    compaction = None
+    if settings.LOCAL_VECTOR_INDEX:
+        with primary() as db:
+            backfill_vector_indexes(db)
+        compaction = asyncio.create_task(compact_periodically())
+
+    # Abandoned resumable uploads: expire their sessions and delete their part files
+    upload_cleanup = asyncio.create_task(cleanup_upload_sessions_periodically(primary))
+
+    # One storage and one LLM client per process; their connection pools are shared by all requests
+    get_storage()
+    get_llm_service()
 
     yield
-    # Shutdown (nothing needed)
+
+    # Shutdown
+    for task in (compaction, upload_cleanup):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await close_storage()
+    await close_llm_service()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -37,4 +81,9 @@ app.include_router(llm.router, prefix="/llm", tags=["Chat"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(items.router, prefix="/items", tags=["Items"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
-app.include_router(img.router, prefix="/img-analysis", tags=["IMG"])
\ No newline at end of file
+app.include_router(img.router, prefix="/img-analysis", tags=["IMG"])
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+
+if settings.STORAGE_BACKEND == "local":
+    from App.api.v1.routers import storage
+    app.include_router(storage.router, prefix="/storage", tags=["Storage"])
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from App.db.base import Base
+import uuid
+from datetime import datetime
+
+
+class VideoJob(Base):
+    __tablename__ = "video_jobs"
+    __table_args__ = (
+        Index("ix_video_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    storage_path = Column(String, nullable=False)
+    video_url = Column(String, nullable=False)
+    media_id = Column(UUID(as_uuid=True), ForeignKey("media_objects.id"), nullable=True)
+
+    # queued -> processing -> done | failed
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    worker_id = Column(String, nullable=True)
+    video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+
+    video = relationship("Video")
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, String, ForeignKey, DateTime, BigInteger, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from App.db.base import Base
+import uuid
+from datetime import datetime
+
+
+class MediaObject(Base):
+    """One stored upload per distinct content hash, shared by every owner who uploads it"""
+    __tablename__ = "media_objects"
+    __table_args__ = (
+        UniqueConstraint("kind", "sha256", name="uq_media_objects_kind_sha256"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)  # "video" | "image"
+    sha256 = Column(String(64), nullable=False)
+    storage_path = Column(String, nullable=False)
+    public_url = Column(String, nullable=False)
+    size_bytes = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Processing results reused for duplicate uploads
+    video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), nullable=True)
+    analysis = Column(String, nullable=True)
+
+    video = relationship("Video")
+    links = relationship("MediaLink", back_populates="media", cascade="all, delete-orphan")
+
+
+class MediaLink(Base):
+    """Per-owner reference to a shared MediaObject"""
+    __tablename__ = "media_links"
+    __table_args__ = (
+        UniqueConstraint("media_id", "owner_id", name="uq_media_links_media_owner"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    media_id = Column(UUID(as_uuid=True), ForeignKey("media_objects.id"), nullable=False)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    filename = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    media = relationship("MediaObject", back_populates="links")
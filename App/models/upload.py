@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, ForeignKey, DateTime, BigInteger
+from sqlalchemy.dialects.postgresql import UUID
+from App.db.base import Base
+import uuid
+from datetime import datetime
+
+
+class UploadSession(Base):
+    """Resumable video upload; bytes are spooled to a local part file until finalized"""
+    __tablename__ = "upload_sessions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, nullable=False, default=0)  # bytes [0, offset) received
+
+    # open -> finalizing -> finalized, or expired when abandoned (UPLOAD_SESSION_EXPIRE_SECONDS)
+    status = Column(String, nullable=False, default="open")
+    job_id = Column(UUID(as_uuid=True), ForeignKey("video_jobs.id"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
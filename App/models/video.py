@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime
+from sqlalchemy import Column, String, ForeignKey, DateTime, Float
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from App.db.base import Base
@@ -15,6 +15,8 @@ class Video(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     video_url = Column(String, nullable=False)
     transcript = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)
+    skipped_audio_seconds = Column(Float, nullable=True)  # silence removed before transcription
 
     owner = relationship("User", back_populates="videos")
     chunks = relationship(
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
 from App.models.embedding import Embedding
+from App.services.similarity import similarity_engine
+from App.services.vector_index import get_vector_index
 from uuid import UUID
 
 
@@ -9,14 +11,23 @@ async def create_embedding(db: Session, chat_id: UUID, vector: list[float]) -> E
         emb.vector = vector
         db.commit()
         db.refresh(emb)
+        _index_vector(emb.chat_id, vector)
         return emb
     db_emb = Embedding(chat_id=chat_id, vector=vector)
     db.add(db_emb)
     db.commit()
     db.refresh(db_emb)
+    _index_vector(db_emb.chat_id, vector)
     return db_emb
 
 
+def _index_vector(chat_id: UUID, vector) -> None:
+    similarity_engine.upsert(chat_id, vector)
+    index = get_vector_index("embeddings")
+    if index is not None and vector is not None:
+        index.add([chat_id], [vector])
+
+
 async def get_embedding(db: Session, chat_id: UUID) -> Embedding | None:
     return db.query(Embedding).filter(Embedding.chat_id == chat_id).first()
 
@@ -25,4 +36,8 @@ async def get_all_embeddings(db: Session, chat_id: UUID | None = None) -> list[E
     query = db.query(Embedding)
     if chat_id:
         query = query.filter(Embedding.chat_id == chat_id)
-    return query.all()
\ No newline at end of file
+    return query.all()
+
+def get_all_vectors(db: Session) -> list[tuple[UUID, object]]:
+    """(chat_id, vector) for every embedding, without building ORM objects"""
+    return db.query(Embedding.chat_id, Embedding.vector).all()
@@ -0,0 +1,196 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import or_, and_, exists
+from datetime import datetime, timedelta
+from typing import Optional
+from App.models.job import VideoJob
+from uuid import UUID
+
+
+async def create_video_job(
+    db: Session,
+    owner_id: UUID,
+    title: str,
+    filename: str,
+    storage_path: str,
+    video_url: str,
+    media_id: UUID | None = None,
+    video_id: UUID | None = None
+) -> VideoJob:
+    """Queue a job; with video_id (already processed content) the job is created as done"""
+    job = VideoJob(
+        owner_id=owner_id,
+        title=title,
+        filename=filename,
+        storage_path=storage_path,
+        video_url=video_url,
+        media_id=media_id,
+        video_id=video_id,
+        status="done" if video_id else "queued"
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+async def get_video_job(db: Session, job_id: UUID) -> Optional[VideoJob]:
+    return db.query(VideoJob).filter(VideoJob.id == job_id).first()
+
+
+async def claim_next_video_job(
+    db: Session,
+    worker_id: str,
+    max_attempts: int,
+    stale_after_seconds: int
+) -> Optional[VideoJob]:
+    """
+    Claim the oldest runnable job using FOR UPDATE SKIP LOCKED so that
+    concurrent workers never pick the same row. Jobs left in 'processing'
+    by a crashed worker become claimable again after stale_after_seconds,
+    or are marked failed if that crash was their last attempt. A job waits
+    while another job for the same content is running, and then reuses its
+    video.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    (
+        db.query(VideoJob)
+        .filter(
+            VideoJob.attempts >= max_attempts,
+            VideoJob.status == "processing",
+            VideoJob.locked_at < stale_before
+        )
+        .update(
+            {
+                VideoJob.status: "failed",
+                VideoJob.error: "Worker stopped during the last attempt",
+                VideoJob.locked_at: None
+            },
+            synchronize_session=False
+        )
+    )
+
+    running = aliased(VideoJob)
+    job = (
+        db.query(VideoJob)
+        .filter(
+            VideoJob.attempts < max_attempts,
+            or_(
+                VideoJob.status == "queued",
+                and_(VideoJob.status == "processing", VideoJob.locked_at < stale_before)
+            ),
+            ~exists().where(
+                running.media_id == VideoJob.media_id,
+                running.id != VideoJob.id,
+                running.status == "processing",
+                running.locked_at >= stale_before
+            )
+        )
+        .order_by(VideoJob.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.commit()
+        return None
+
+    job.status = "processing"
+    job.worker_id = worker_id
+    job.locked_at = datetime.utcnow()
+    job.attempts += 1
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _held_job(db: Session, job_id: UUID, worker_id: str) -> Optional[VideoJob]:
+    """The job, locked, if it is still being processed by worker_id (not reclaimed as stale since)"""
+    return (
+        db.query(VideoJob)
+        .filter(
+            VideoJob.id == job_id,
+            VideoJob.worker_id == worker_id,
+            VideoJob.status == "processing"
+        )
+        .with_for_update()
+        .first()
+    )
+
+
+async def get_running_job_for_media(db: Session, media_id: UUID, job: VideoJob) -> Optional[VideoJob]:
+    """Another job for the same content that is processing and was queued before `job`"""
+    return (
+        db.query(VideoJob)
+        .filter(
+            VideoJob.media_id == media_id,
+            VideoJob.id != job.id,
+            VideoJob.status == "processing",
+            VideoJob.created_at < job.created_at
+        )
+        .first()
+    )
+
+
+async def set_video_job_media(db: Session, job_id: UUID, media_id: UUID) -> None:
+    """Record the content of a job that was queued before it was hashed (direct uploads)"""
+    db.query(VideoJob).filter(VideoJob.id == job_id).update(
+        {VideoJob.media_id: media_id}, synchronize_session=False
+    )
+    db.commit()
+
+
+async def defer_video_job(db: Session, job_id: UUID, worker_id: str) -> bool:
+    """Requeue a claimed job without using up an attempt; False if worker_id no longer holds it"""
+    job = _held_job(db, job_id, worker_id)
+    if not job:
+        db.commit()
+        return False
+    job.status = "queued"
+    job.attempts -= 1
+    job.locked_at = None
+    db.commit()
+    return True
+
+
+async def heartbeat_video_job(db: Session, job_id: UUID, worker_id: str) -> bool:
+    """Refresh locked_at of a running job; False if worker_id no longer holds it"""
+    updated = (
+        db.query(VideoJob)
+        .filter(
+            VideoJob.id == job_id,
+            VideoJob.worker_id == worker_id,
+            VideoJob.status == "processing"
+        )
+        .update({VideoJob.locked_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+    return updated > 0
+
+
+async def complete_video_job(db: Session, job_id: UUID, worker_id: str, video_id: UUID) -> bool:
+    """Mark the job done; False (and no change) if worker_id no longer holds it"""
+    job = _held_job(db, job_id, worker_id)
+    if not job:
+        db.commit()
+        return False
+    job.status = "done"
+    job.video_id = video_id
+    job.error = None
+    job.locked_at = None
+    db.commit()
+    return True
+
+
+async def fail_video_job(db: Session, job_id: UUID, worker_id: str, error: str, max_attempts: int) -> bool:
+    """
+    Put the job back in the queue, or mark it failed once attempts are
+    exhausted; False (and no change) if worker_id no longer holds it.
+    """
+    job = _held_job(db, job_id, worker_id)
+    if not job:
+        db.commit()
+        return False
+    job.status = "failed" if job.attempts >= max_attempts else "queued"
+    job.error = error
+    job.locked_at = None
+    db.commit()
+    return True
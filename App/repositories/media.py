@@ -0,0 +1,81 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
+from App.models.media import MediaObject, MediaLink
+from uuid import UUID
+
+
+async def get_media_by_hash(db: Session, kind: str, sha256: str) -> Optional[MediaObject]:
+    return (
+        db.query(MediaObject)
+        .filter(MediaObject.kind == kind, MediaObject.sha256 == sha256)
+        .first()
+    )
+
+
+async def get_media(db: Session, media_id: UUID) -> Optional[MediaObject]:
+    return db.query(MediaObject).filter(MediaObject.id == media_id).first()
+
+
+async def create_media(
+    db: Session,
+    kind: str,
+    sha256: str,
+    storage_path: str,
+    public_url: str,
+    size_bytes: int | None = None
+) -> MediaObject:
+    """Create the media record; if another request stored the same content first, return that one"""
+    media = MediaObject(
+        kind=kind,
+        sha256=sha256,
+        storage_path=storage_path,
+        public_url=public_url,
+        size_bytes=size_bytes
+    )
+    db.add(media)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return await get_media_by_hash(db, kind, sha256)
+    db.refresh(media)
+    return media
+
+
+async def link_media_owner(db: Session, media_id: UUID, owner_id: UUID, filename: str | None = None) -> MediaLink:
+    link = (
+        db.query(MediaLink)
+        .filter(MediaLink.media_id == media_id, MediaLink.owner_id == owner_id)
+        .first()
+    )
+    if link:
+        return link
+    link = MediaLink(media_id=media_id, owner_id=owner_id, filename=filename)
+    db.add(link)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return (
+            db.query(MediaLink)
+            .filter(MediaLink.media_id == media_id, MediaLink.owner_id == owner_id)
+            .first()
+        )
+    db.refresh(link)
+    return link
+
+
+async def set_media_video(db: Session, media_id: UUID, video_id: UUID) -> None:
+    """Record the processed video for this content (first writer wins)"""
+    media = db.query(MediaObject).filter(MediaObject.id == media_id).first()
+    if media and media.video_id is None:
+        media.video_id = video_id
+        db.commit()
+
+
+async def set_media_analysis(db: Session, media_id: UUID, analysis: str) -> None:
+    media = db.query(MediaObject).filter(MediaObject.id == media_id).first()
+    if media:
+        media.analysis = analysis
+        db.commit()
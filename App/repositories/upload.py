@@ -0,0 +1,75 @@
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime, timedelta
+from App.models.upload import UploadSession
+from uuid import UUID
+
+
+async def create_upload_session(db: Session, owner_id: UUID, title: str, filename: str, size: int) -> UploadSession:
+    session = UploadSession(owner_id=owner_id, title=title, filename=filename, size=size, offset=0, status="open")
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+async def get_upload_session(db: Session, session_id: UUID) -> Optional[UploadSession]:
+    return db.query(UploadSession).filter(UploadSession.id == session_id).first()
+
+
+async def advance_upload_session(db: Session, session_id: UUID, end: int) -> Optional[UploadSession]:
+    """Move the received offset forward to `end` (never backwards)"""
+    session = (
+        db.query(UploadSession)
+        .filter(UploadSession.id == session_id)
+        .with_for_update()
+        .first()
+    )
+    if not session:
+        return None
+    session.offset = max(session.offset, end)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+async def claim_upload_session(db: Session, session_id: UUID) -> bool:
+    """Atomically move an open session to 'finalizing'; False if another request got there first"""
+    claimed = (
+        db.query(UploadSession)
+        .filter(UploadSession.id == session_id, UploadSession.status == "open")
+        .update({UploadSession.status: "finalizing"}, synchronize_session=False)
+    )
+    db.commit()
+    return claimed == 1
+
+
+async def reopen_upload_session(db: Session, session_id: UUID) -> None:
+    """Give a session whose finalize failed back to the client, so it can retry"""
+    db.query(UploadSession).filter(
+        UploadSession.id == session_id, UploadSession.status == "finalizing"
+    ).update({UploadSession.status: "open"}, synchronize_session=False)
+    db.commit()
+
+
+async def expire_upload_sessions(db: Session, expire_after_seconds: int) -> int:
+    """Mark sessions untouched for expire_after_seconds as expired; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(seconds=expire_after_seconds)
+    expired = (
+        db.query(UploadSession)
+        .filter(
+            UploadSession.status.in_(["open", "finalizing"]),
+            UploadSession.updated_at < cutoff
+        )
+        .update({UploadSession.status: "expired"}, synchronize_session=False)
+    )
+    db.commit()
+    return expired
+
+
+async def finalize_upload_session(db: Session, session_id: UUID, job_id: UUID) -> None:
+    session = db.query(UploadSession).filter(UploadSession.id == session_id).first()
+    if session:
+        session.status = "finalized"
+        session.job_id = job_id
+        db.commit()
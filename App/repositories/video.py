@@ -1,8 +1,13 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, insert, func
 from App.models.video import Video
 from App.models.chunk import VideoChunk
-from App.services.llm import llm_service
+from App.services.llm import get_llm_service
+from App.core.config import settings
+from App.db.indexes import set_search_params, candidate_order, sql_quantization, disable_index_scans
+from App.services.vector_index import get_vector_index
+import csv
+import io
 import uuid
 
 # ---------- VIDEO ----------
@@ -66,26 +71,218 @@ async def create_chunk(
     return chunk
 
 
+async def create_chunks_bulk(db: Session, video_id, chunks: list[dict]) -> list[uuid.UUID]:
+    """
+    Insert all chunks of a video in one transaction and return their ids.
+
+    Each dict has chunk_index, content, summary, start_time, end_time, embedding.
+    Ids are generated client side, so no per-row refresh is needed. Batches of
+    CHUNK_COPY_THRESHOLD rows or more use COPY on psycopg2, else executemany.
+    """
+    if not chunks:
+        return []
+
+    try:
+        rows = _insert_chunks(db, video_id, chunks)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _index_chunks(rows)
+    return [row["id"] for row in rows]
+
+
+async def create_video_with_chunks(db: Session, video: Video, chunks: list[dict]) -> Video:
+    """
+    Insert a fully processed video and all its chunks in a single transaction,
+    so a failure part way never leaves a video without chunks behind.
+    """
+    try:
+        db.add(video)
+        db.flush()
+        rows = _insert_chunks(db, video.id, chunks) if chunks else []
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _index_chunks(rows)
+    db.refresh(video)
+    return video
+
+
+def _insert_chunks(db: Session, video_id, chunks: list[dict]) -> list[dict]:
+    """Insert chunk rows in the session's current transaction, without committing"""
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "video_id": video_id,
+            "chunk_index": c["chunk_index"],
+            "content": c["content"],
+            "summary": c.get("summary"),
+            "start_time": c.get("start_time"),
+            "end_time": c.get("end_time"),
+            "embedding": [float(x) for x in c["embedding"]],
+        }
+        for c in chunks
+    ]
+    if len(rows) >= settings.CHUNK_COPY_THRESHOLD and db.get_bind().dialect.driver == "psycopg2":
+        _copy_chunks(db, rows)
+    else:
+        db.execute(insert(VideoChunk), rows)
+    return rows
+
+
+def _index_chunks(rows: list[dict]) -> None:
+    """Add committed chunks to the local vector index, when it is enabled"""
+    index = get_vector_index("video_chunks")
+    if index is not None and rows:
+        index.add([row["id"] for row in rows], [row["embedding"] for row in rows])
+
+
+def _copy_chunks(db: Session, rows: list[dict]) -> None:
+    """COPY rows into video_chunks inside the session's current transaction"""
+    columns = ["id", "video_id", "chunk_index", "content", "summary", "start_time", "end_time", "embedding"]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for row in rows:
+        writer.writerow([
+            row["id"],
+            row["video_id"],
+            row["chunk_index"],
+            row["content"],
+            "" if row["summary"] is None else row["summary"],
+            "" if row["start_time"] is None else row["start_time"],
+            "" if row["end_time"] is None else row["end_time"],
+            "[" + ",".join(repr(x) for x in row["embedding"]) + "]",
+        ])
+    buffer.seek(0)
+
+    # FORCE_NULL turns quoted empty strings back into NULL for the nullable columns
+    sql = (
+        f"COPY video_chunks ({', '.join(columns)}) FROM STDIN "
+        "WITH (FORMAT csv, FORCE_NULL (summary, start_time, end_time))"
+    )
+    raw = db.connection().connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
 async def get_chunk_by_id(db: Session, chunk_id):
     return db.query(VideoChunk).filter(VideoChunk.id == chunk_id).first()
 
 
-async def search_similar_chunks(db: Session, query_vector: list[float], top_k: int = 5):
-    vector_str = "[" + ",".join(str(x) for x in query_vector) + "]"
-    sql = text("""
-        SELECT id
-        FROM video_chunks
-        ORDER BY embedding <-> CAST(:query_vector AS vector)
-        LIMIT :limit
+_QUERY_VECTOR = "CAST(:query_vector AS vector)"
+
+
+def _vector_literal(vector) -> str:
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+async def search_similar_chunks(
+    db: Session,
+    query_vector: list[float],
+    top_k: int = 5,
+    ef_search: int | None = None,
+    probes: int | None = None
+):
+    """
+    Nearest chunks with their video title and cosine similarity, closest first.
+    One round-trip: the ANN index picks candidates (on the quantized form when
+    VECTOR_QUANTIZATION is set, VECTOR_RERANK_FACTOR per result), they are
+    re-ranked by exact distance to the full vectors, and only the k hits are
+    joined to videos. The embedding column is never returned.
+    With LOCAL_VECTOR_INDEX the neighbours come from the on-disk index instead.
+    """
+    index = get_vector_index("video_chunks")
+    if index is not None:
+        return _fetch_local_hits(db, index.search(query_vector, top_k))
+
+    candidates = top_k if sql_quantization() == "none" else top_k * settings.VECTOR_RERANK_FACTOR
+    set_search_params(db, candidates, ef_search=ef_search, probes=probes)
+    sql = text(f"""
+        WITH candidates AS (
+            SELECT id, video_id, summary, start_time, end_time, embedding
+            FROM video_chunks
+            ORDER BY {candidate_order("embedding", _QUERY_VECTOR)}
+            LIMIT :candidates
+        ),
+        nearest AS (
+            SELECT id, video_id, summary, start_time, end_time,
+                   embedding <-> {_QUERY_VECTOR} AS distance,
+                   1 - (embedding <=> {_QUERY_VECTOR}) AS similarity_score
+            FROM candidates
+            ORDER BY distance
+            LIMIT :limit
+        )
+        SELECT n.id AS chunk_id, n.video_id, v.title, n.summary,
+               n.similarity_score, n.start_time, n.end_time
+        FROM nearest n
+        JOIN videos v ON v.id = n.video_id
+        ORDER BY n.distance
     """)
-    result = db.execute(sql, {"query_vector": vector_str, "limit": top_k})
-    chunk_ids = [row.id for row in result.fetchall()]
+    params = {"query_vector": _vector_literal(query_vector), "limit": top_k, "candidates": candidates}
+    result = db.execute(sql, params)
+    return [dict(row) for row in result.mappings().all()]
 
-    return (
-        db.query(VideoChunk)
-        .filter(VideoChunk.id.in_(chunk_ids))
+
+async def measure_search_recall(db: Session, samples: int = 20, top_k: int = 10) -> dict:
+    """
+    Recall@k of search_similar_chunks against exact search, using stored chunk
+    embeddings as queries. Shows what the configured index, quantization and
+    re-rank factor cost in accuracy.
+    """
+    index = get_vector_index("video_chunks")
+    queries = [
+        row.embedding
+        for row in db.query(VideoChunk.embedding).order_by(func.random()).limit(samples).all()
+    ]
+
+    recalls = []
+    for query_vector in queries:
+        found = {row["chunk_id"] for row in await search_similar_chunks(db, query_vector, top_k)}
+        if index is not None:
+            exact = {chunk_id for chunk_id, _, _ in index.search(query_vector, top_k, exact=True)}
+        else:
+            disable_index_scans(db)
+            exact = set(db.execute(
+                text(f"SELECT id FROM video_chunks ORDER BY embedding <-> {_QUERY_VECTOR} LIMIT :limit"),
+                {"query_vector": _vector_literal(query_vector), "limit": top_k}
+            ).scalars().all())
+            db.rollback()  # ends the transaction-local planner settings
+        if exact:
+            recalls.append(len(found & exact) / len(exact))
+
+    return {
+        "samples": len(recalls),
+        "top_k": top_k,
+        "recall": sum(recalls) / len(recalls) if recalls else None,
+        "quantization": settings.VECTOR_QUANTIZATION,
+        "rerank_factor": settings.VECTOR_RERANK_FACTOR,
+        "backend": "local" if index is not None else settings.VECTOR_INDEX_TYPE,
+    }
+
+
+def _fetch_local_hits(db: Session, hits: list) -> list[dict]:
+    """Rows for (chunk id, distance, similarity) hits from the local index, in hit order"""
+    if not hits:
+        return []
+    rows = (
+        db.query(
+            VideoChunk.id.label("chunk_id"), VideoChunk.video_id, Video.title, VideoChunk.summary,
+            VideoChunk.start_time, VideoChunk.end_time
+        )
+        .join(Video, Video.id == VideoChunk.video_id)
+        .filter(VideoChunk.id.in_([chunk_id for chunk_id, _, _ in hits]))
         .all()
     )
+    by_id = {row.chunk_id: dict(row._mapping) for row in rows}
+    return [
+        {**by_id[chunk_id], "similarity_score": similarity}
+        for chunk_id, _, similarity in hits
+        if chunk_id in by_id
+    ]
 
 async def create_video_chunks(db, video_id: str, transcript: str, video_duration: float):
 
@@ -95,26 +292,24 @@ async def create_video_chunks(db, video_id: str, transcript: str, video_duration
 
     chunks_info = generate_chunks_with_timing(transcript, video_duration, max_words_per_chunk=100)
 
-    for idx, info in enumerate(chunks_info):
-        embedding_vector = await llm_service.emb([info["content"]])
-        embedding_vector = to_float_list(embedding_vector[0])
+    vectors = await get_llm_service().emb_batched([info["content"] for info in chunks_info])
 
-        summary_text = await llm_service.chat([
+    rows = []
+    for idx, (info, embedding_vector) in enumerate(zip(chunks_info, vectors)):
+        summary_text = await get_llm_service().chat([
             {"role": "user", "content": f"Summarize this text into a short point:\n{info['content']}"}
         ])
 
-        chunk = VideoChunk(
-            video_id=video_id,
-            chunk_index=idx,
-            content=info["content"],
-            summary=summary_text,
-            start_time=info["start_time"],
-            end_time=info["end_time"],
-            embedding=embedding_vector
-        )
-        db.add(chunk)
+        rows.append({
+            "chunk_index": idx,
+            "content": info["content"],
+            "summary": summary_text,
+            "start_time": info["start_time"],
+            "end_time": info["end_time"],
+            "embedding": to_float_list(embedding_vector)
+        })
 
-    db.commit()
+    await create_chunks_bulk(db, video_id, rows)
 
 def generate_chunks_with_timing(transcript: str, video_duration: float, max_words_per_chunk: int = 100):
     words = transcript.split()
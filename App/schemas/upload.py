@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+
+class PresignRequest(BaseModel):
+    kind: Literal["video", "chat", "image"]
+    filename: str
+
+
+class PresignResponse(BaseModel):
+    kind: str
+    storage_path: str
+    upload_url: str
+    token: Optional[str] = None
+
+
+class FinalizeVideoRequest(BaseModel):
+    storage_path: str
+    title: str
+
+
+class FinalizeImageRequest(BaseModel):
+    storage_path: str
+    mime_type: str = "image/jpeg"
+
+
+class FinalizeChatFileRequest(BaseModel):
+    storage_path: str
+
+
+class FinalizeChatFileResponse(BaseModel):
+    storage_path: str
+    file_url: str
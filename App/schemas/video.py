@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import datetime
 from typing import Optional, List
@@ -10,6 +10,8 @@ class VideoResponse(BaseModel):
     description: Optional[str]
     video_url: str
     created_at: datetime
+    duration: Optional[float] = None
+    skipped_audio_seconds: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -59,4 +61,39 @@ class VideoWithChunksResponse(BaseModel):
     chunks: List[VideoChunkResponse] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class VideoJobResponse(BaseModel):
+    id: UUID
+    title: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    video_id: Optional[UUID] = None
+    video_url: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class UploadSessionCreate(BaseModel):
+    title: str
+    filename: str
+    size: int = Field(..., gt=0)
+
+
+class UploadSessionResponse(BaseModel):
+    id: UUID
+    title: str
+    filename: str
+    size: int
+    offset: int
+    status: str
+    job_id: Optional[UUID] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,35 +1,70 @@
+import asyncio
 import base64
 import cohere
+import httpx
+from typing import AsyncIterator
 from App.core.config import settings
-from fastapi.concurrency import run_in_threadpool
 
 
 class LLMService:
+    """
+    Cohere chat, embedding and vision calls on the native async client.
+    Requests share one keep-alive httpx pool, so concurrency is bounded by
+    LLM_MAX_CONNECTIONS rather than by the threadpool. Use get_llm_service()
+    for the process-wide instance (aget_llm_service() as a route dependency).
+    """
+
     def __init__(self):
-        self.client = cohere.ClientV2(settings.COHERE_API_KEY)
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0),
+        )
+        self.client = cohere.AsyncClientV2(settings.COHERE_API_KEY, httpx_client=self.http)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    @staticmethod
+    def _attach_file(messages: list, file_url: str | None) -> list:
+        if file_url:
+            last_message = messages[-1]["content"]
+            messages[-1]["content"] = [
+                {"type": "document", "document": {"url": file_url}},
+                {"type": "text", "text": last_message}
+            ]
+        return messages
 
     async def chat(self, messages: list, file_url: str | None = None) -> str:
         try:
-            if file_url:
-                last_message = messages[-1]["content"]
-                messages[-1]["content"] = [
-                    {"type": "document", "document": {"url": file_url}},
-                    {"type": "text", "text": last_message}
-                ]
-
-            response = await run_in_threadpool(
-                self.client.chat,
+            response = await self.client.chat(
                 model=settings.LLM_MODEL,
-                messages=messages
+                messages=self._attach_file(messages, file_url)
             )
             return response.message.content[0].text
 
         except Exception as e:
             raise RuntimeError(f"LLM error: {e}") from e
 
+    async def chat_stream(self, messages: list, file_url: str | None = None) -> AsyncIterator[str]:
+        """Yield the reply text piece by piece as Cohere generates it"""
+        try:
+            stream = self.client.chat_stream(
+                model=settings.LLM_MODEL,
+                messages=self._attach_file(messages, file_url)
+            )
+            async for event in stream:
+                if event.type == "content-delta":
+                    yield event.delta.message.content.text
+
+        except Exception as e:
+            raise RuntimeError(f"LLM error: {e}") from e
+
     async def emb(self, text_inputs: list[str]) -> list[list[float]]:
-        response = await run_in_threadpool(
-            self.client.embed,
+        response = await self.client.embed(
             model=settings.EMB_MODEL,
             texts=text_inputs,
             input_type="classification",
@@ -37,13 +72,33 @@ class LLMService:
         )
         return response.embeddings.float
 
+    async def emb_batched(
+        self,
+        text_inputs: list[str],
+        batch_size: int | None = None,
+        max_concurrency: int | None = None
+    ) -> list[list[float]]:
+        """
+        Embed any number of texts in provider-max batches.
+        Batches run concurrently (bounded) and results keep input order.
+        """
+        batch_size = batch_size or settings.EMB_BATCH_SIZE
+        semaphore = asyncio.Semaphore(max_concurrency or settings.EMB_MAX_CONCURRENCY)
+
+        async def _embed_batch(batch: list[str]) -> list[list[float]]:
+            async with semaphore:
+                return await self.emb(batch)
+
+        batches = [text_inputs[i:i + batch_size] for i in range(0, len(text_inputs), batch_size)]
+        results = await asyncio.gather(*(_embed_batch(b) for b in batches))
+        return [vector for batch in results for vector in batch]
+
     async def analyze_image(self, image_bytes: bytes, mime_type: str) -> str:
         try:
             encoded_image = base64.b64encode(image_bytes).decode("utf-8")
             image_data = f"data:{mime_type};base64,{encoded_image}"
 
-            response = await run_in_threadpool(
-                self.client.chat,
+            response = await self.client.chat(
                 model=settings.VISION_MODEL,
                 messages=[
                     {
@@ -59,5 +114,29 @@ class LLMService:
 
         except Exception as e:
             raise RuntimeError(f"Vision error: {e}") from e
-        
-llm_service = LLMService()
+
+
+_llm_service: LLMService | None = None
+
+
+def get_llm_service() -> LLMService:
+    """
+    Process-wide LLMService. Created once (in the app lifespan, or on first
+    use in workers) so all call sites share its connection pool.
+    """
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService()
+    return _llm_service
+
+
+async def aget_llm_service() -> LLMService:
+    """get_llm_service as a FastAPI dependency: async, so it does not take a threadpool slot"""
+    return get_llm_service()
+
+
+async def close_llm_service() -> None:
+    global _llm_service
+    if _llm_service is not None:
+        await _llm_service.aclose()
+        _llm_service = None
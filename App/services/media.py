@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from App.core.config import settings
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    filename: str
+    content_type: str | None
+    size: int
+    sha256: str
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def read_head(self, n: int) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read(n)
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a local file, read in bounded chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(SPOOL_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _upload_session_dir() -> str:
+    directory = settings.UPLOAD_SESSION_DIR or os.path.join(tempfile.gettempdir(), "video-uploads")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def upload_session_path(session_id) -> str:
+    """Local part file holding the bytes received so far for a resumable upload"""
+    return os.path.join(_upload_session_dir(), f"{session_id}.part")
+
+
+def _remove_stale_part_files(expire_after_seconds: int) -> int:
+    """Delete part files not written to for expire_after_seconds (this node's directory only)"""
+    directory = _upload_session_dir()
+    cutoff = time.time() - expire_after_seconds
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".part") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def cleanup_upload_sessions(session_factory) -> None:
+    """Expire abandoned resumable uploads and delete their part files"""
+    from App.repositories import upload as upload_repo
+
+    expire_after = settings.UPLOAD_SESSION_EXPIRE_SECONDS
+    with session_factory() as db:
+        expired = await upload_repo.expire_upload_sessions(db, expire_after)
+    removed = await asyncio.to_thread(_remove_stale_part_files, expire_after)
+    if expired or removed:
+        logger.info(f"Expired {expired} upload session(s), removed {removed} part file(s)")
+
+
+async def cleanup_upload_sessions_periodically(session_factory) -> None:
+    """Background task of the API: run cleanup_upload_sessions every UPLOAD_SESSION_CLEANUP_SECONDS"""
+    while True:
+        try:
+            await cleanup_upload_sessions(session_factory)
+        except Exception as e:
+            logger.error(f"Upload session cleanup failed: {e}")
+        await asyncio.sleep(settings.UPLOAD_SESSION_CLEANUP_SECONDS)
+
+
+@asynccontextmanager
+async def spool_upload(file: UploadFile) -> AsyncIterator[SpooledUpload]:
+    """
+    Copy an upload to a local file in bounded chunks, computing its SHA-256 on
+    the way. Storage and processing then read from the path, so memory per
+    upload stays constant. The file is removed when the block exits.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=settings.UPLOAD_SPOOL_DIR)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(SPOOL_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                await run_in_threadpool(out.write, chunk)
+
+        yield SpooledUpload(
+            path=path,
+            filename=file.filename,
+            content_type=file.content_type,
+            size=size,
+            sha256=digest.hexdigest()
+        )
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Iterable
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+from App.core.config import settings
+
+METRICS = ("cosine", "euclidean", "dot", "hybrid")
+INITIAL_CAPACITY = 1024
+
+
+class SimilarityEngine:
+    """
+    In-memory scoring over the `embeddings` table.
+
+    The corpus is one contiguous float32 matrix with precomputed norms, so a
+    query scores all four metrics from a single matrix-vector product and
+    picks top-k with argpartition. create_embedding() upserts rows as they are
+    written; writes from other processes are picked up by a full reload every
+    SIMILARITY_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: list[UUID] = []
+        self._rows: dict[UUID, int] = {}
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._size = 0
+        self._loaded_at: float | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ---------- loading & updates ----------
+
+    def load(self, rows: Iterable[tuple[UUID, object]]) -> None:
+        """Replace the corpus with (id, vector) rows"""
+        ids, vectors = [], []
+        for row_id, vector in rows:
+            if vector is not None:
+                ids.append(row_id)
+                vectors.append(np.asarray(vector, dtype=np.float32))
+
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self._ids = ids
+            self._rows = {row_id: i for i, row_id in enumerate(ids)}
+            self._matrix = np.ascontiguousarray(matrix)
+            self._norms = np.linalg.norm(matrix, axis=1).astype(np.float32) if len(ids) else np.empty(0, np.float32)
+            self._size = len(ids)
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session) -> None:
+        """(Re)load from the database on first use and once the refresh interval has passed"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < settings.SIMILARITY_REFRESH_SECONDS:
+            return
+        from App.services.vector_index import get_vector_index
+        index = get_vector_index("embeddings")
+        if index is not None:
+            # Mapped from local disk: no table scan
+            ids, vectors = index.items()
+            self.load(zip(ids, vectors))
+            return
+        from App.repositories.embedding import get_all_vectors
+        self.load(get_all_vectors(db))
+
+    def upsert(self, row_id: UUID, vector) -> None:
+        """Add or replace one vector without reloading the corpus"""
+        if self._loaded_at is None or vector is None:
+            return  # not loaded yet: the first query loads everything
+        vector = np.asarray(vector, dtype=np.float32)
+
+        with self._lock:
+            row = self._rows.get(row_id)
+            if row is None:
+                row = self._size
+                self._grow(row + 1, vector.shape[0])
+                self._ids.append(row_id)
+                self._rows[row_id] = row
+                self._size += 1
+            self._matrix[row] = vector
+            self._norms[row] = np.linalg.norm(vector)
+
+    def _grow(self, needed: int, dim: int) -> None:
+        """Amortized doubling so appends do not copy the matrix each time"""
+        capacity = self._matrix.shape[0]
+        if capacity >= needed:
+            return
+        new_capacity = max(needed, capacity * 2, INITIAL_CAPACITY)
+        matrix = np.empty((new_capacity, dim), dtype=np.float32)
+        norms = np.empty(new_capacity, dtype=np.float32)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+        self._matrix, self._norms = matrix, norms
+
+    # ---------- queries ----------
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+        keys = -scores if largest else scores
+        if k < len(keys):
+            candidates = np.argpartition(keys, k)[:k]
+        else:
+            candidates = np.arange(len(keys))
+        return candidates[np.argsort(keys[candidates], kind="stable")]
+
+    def search(self, query_vector, top_k: int = 5, alpha: float = 0.5) -> dict[str, list[tuple[UUID, float]]]:
+        """Top-k (id, score) per metric; euclidean is a distance, the rest are similarities"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return {metric: [] for metric in METRICS}
+            matrix, norms = self._matrix[:n], self._norms[:n]
+
+            dots = matrix @ query
+            query_norm = np.linalg.norm(query)
+            denom = norms * query_norm
+            cosine = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+            euclidean = np.sqrt(np.maximum(norms ** 2 + query_norm ** 2 - 2 * dots, 0.0))
+            hybrid = alpha * cosine + (1 - alpha) / (1 + euclidean)
+
+            scores = {"cosine": cosine, "euclidean": euclidean, "dot": dots, "hybrid": hybrid}
+            results = {}
+            for metric, values in scores.items():
+                top = self._top_k(values, top_k, largest=(metric != "euclidean"))
+                results[metric] = [(self._ids[i], float(values[i])) for i in top]
+            return results
+
+
+similarity_engine = SimilarityEngine()
@@ -0,0 +1,277 @@
+"""
+Transcription engine.
+
+Media is decoded exactly once: ffmpeg extracts 16 kHz mono float32 PCM into a
+file that is memory-mapped by whoever needs it. The duration comes from the
+sample count and the same samples are handed straight to the speech model.
+
+The speech model sits behind TranscriptionBackend. "whisper" runs the
+reference PyTorch model; "faster-whisper" runs the CTranslate2 port, which
+with int8 weights is several times faster on CPU at the same model size.
+
+Before transcription an optional VAD pass (App.services.vad) drops stretches
+without speech; segment timestamps are mapped back to the original timeline
+afterwards.
+
+Transcription is CPU bound, so it runs in a dedicated process pool instead of
+on the event loop. Each pool process loads the backend model once (in the pool
+initializer) and reuses it for every job it receives. Long audio is split into
+overlapping windows that are transcribed in parallel across the pool and then
+stitched back together on segment timestamps.
+"""
+import asyncio
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Optional
+from App.core.config import settings
+from App.services.vad import VADConfig, SpeechMap, detect_speech, compact_speech
+
+SAMPLE_RATE = 16000  # what Whisper expects
+_AUTO_THREADS_PER_WORKER = 4  # max_workers=0: one pool process per this many cores
+_BYTES_PER_SAMPLE = 4  # float32
+
+# Per-process backend, populated by _init_worker inside each pool process
+_backend: Optional["TranscriptionBackend"] = None
+
+
+@dataclass
+class ExtractedAudio:
+    pcm_path: str
+    num_samples: int
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sample_rate
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    name: str
+    model_name: str
+    compute_type: str
+    cpu_threads: int
+
+
+class TranscriptionBackend(ABC):
+    """Speech-to-text model living inside a pool process"""
+
+    @abstractmethod
+    def transcribe(self, audio) -> list[dict]:
+        """Transcribe 16 kHz mono float32 samples into [{"start", "end", "text"}] segments"""
+
+
+class WhisperBackend(TranscriptionBackend):
+    def __init__(self, config: BackendConfig):
+        import torch
+        import whisper
+        if config.cpu_threads:
+            torch.set_num_threads(config.cpu_threads)
+        self.model = whisper.load_model(config.model_name, device="cpu")
+
+    def transcribe(self, audio) -> list[dict]:
+        # fp16 is not supported on CPU and only produces a warning
+        result = self.model.transcribe(audio, fp16=False)
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+            for seg in result.get("segments", [])
+        ]
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    def __init__(self, config: BackendConfig):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            config.model_name,
+            device="cpu",
+            compute_type=config.compute_type,
+            cpu_threads=config.cpu_threads
+        )
+
+    def transcribe(self, audio) -> list[dict]:
+        segments, _ = self.model.transcribe(audio)
+        return [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments]
+
+
+BACKENDS: dict[str, type[TranscriptionBackend]] = {
+    "whisper": WhisperBackend,
+    "faster-whisper": FasterWhisperBackend,
+}
+
+
+def _init_worker(config: BackendConfig) -> None:
+    global _backend
+    _backend = BACKENDS[config.name](config)
+
+
+def _load_pcm(pcm_path: str):
+    import numpy as np
+    return np.memmap(pcm_path, dtype=np.float32, mode="r")
+
+
+def _transcribe_pcm_window(pcm_path: str, start_sample: int, end_sample: int) -> list[dict]:
+    """Transcribe samples [start_sample, end_sample) and return segments on the full-audio timeline"""
+    import numpy as np
+    audio = np.ascontiguousarray(_load_pcm(pcm_path)[start_sample:end_sample])
+    offset = start_sample / SAMPLE_RATE
+    return [
+        {"start": seg["start"] + offset, "end": seg["end"] + offset, "text": seg["text"]}
+        for seg in _backend.transcribe(audio)
+    ]
+
+
+def _plan_windows(num_samples: int, window_seconds: float, overlap_seconds: float) -> list[tuple[int, int, float, float]]:
+    """
+    Split the audio into overlapping windows.
+    Returns (start_sample, end_sample, own_from, own_to): each window only keeps
+    segments whose midpoint falls in its own [own_from, own_to) seconds, which
+    splits every overlap in half and drops duplicated segments.
+    """
+    window = int(window_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    if num_samples <= window or window <= overlap:
+        return [(0, num_samples, 0.0, float("inf"))]
+
+    step = window - overlap
+    starts = list(range(0, num_samples - overlap, step))
+    windows = []
+    for i, start in enumerate(starts):
+        end = min(start + window, num_samples)
+        own_from = 0.0 if i == 0 else (start + overlap / 2) / SAMPLE_RATE
+        own_to = float("inf") if i == len(starts) - 1 else (end - overlap / 2) / SAMPLE_RATE
+        windows.append((start, end, own_from, own_to))
+    return windows
+
+
+def _stitch(window_segments: list[list[dict]], windows: list[tuple[int, int, float, float]]) -> dict:
+    segments = []
+    for segs, (_, _, own_from, own_to) in zip(window_segments, windows):
+        for seg in segs:
+            midpoint = (seg["start"] + seg["end"]) / 2
+            if own_from <= midpoint < own_to:
+                segments.append(seg)
+    segments.sort(key=lambda seg: seg["start"])
+    text = " ".join(seg["text"].strip() for seg in segments if seg["text"].strip())
+    return {"text": text, "segments": segments}
+
+
+def _remove_silence(pcm_path: str, out_path: str, config: VADConfig) -> SpeechMap:
+    audio = _load_pcm(pcm_path)
+    regions = detect_speech(audio, SAMPLE_RATE, config)
+    return compact_speech(audio, regions, out_path, SAMPLE_RATE)
+
+
+async def extract_audio(media_path: str, pcm_path: str) -> ExtractedAudio:
+    """Decode any media file to raw 16 kHz mono float32 PCM in a single ffmpeg pass"""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+        "-i", media_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le",
+        pcm_path,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"Audio extraction failed: {stderr.decode(errors='replace').strip()}")
+
+    return ExtractedAudio(
+        pcm_path=pcm_path,
+        num_samples=os.path.getsize(pcm_path) // _BYTES_PER_SAMPLE
+    )
+
+
+class TranscriptionEngine:
+    def __init__(
+        self,
+        backend: BackendConfig,
+        max_workers: int,
+        window_seconds: float,
+        overlap_seconds: float,
+        vad: Optional[VADConfig] = None
+    ):
+        if backend.name not in BACKENDS:
+            raise ValueError(f"Unknown transcription backend: {backend.name}")
+        self.vad = vad
+        cores = os.cpu_count() or 1
+        self.max_workers = max_workers or max(1, cores // _AUTO_THREADS_PER_WORKER)
+        if not backend.cpu_threads:
+            # Split the cores between pool processes; library defaults would give each of them all cores
+            backend = replace(backend, cpu_threads=max(1, cores // self.max_workers))
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork a process that may already hold torch/threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.backend,)
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), fn, *args)
+
+    async def transcribe(self, audio: ExtractedAudio) -> dict:
+        """
+        Return {"text", "segments", "skipped_seconds"} for extracted audio.
+        Segment times are always on the original audio timeline.
+        """
+        speech_map = None
+        if self.vad and audio.num_samples:
+            speech_path = f"{audio.pcm_path}.speech"
+            speech_map = await self._run(_remove_silence, audio.pcm_path, speech_path, self.vad)
+            audio = ExtractedAudio(pcm_path=speech_path, num_samples=speech_map.speech_samples)
+
+        skipped_seconds = speech_map.skipped_seconds if speech_map else 0.0
+        if audio.num_samples == 0:
+            return {"text": "", "segments": [], "skipped_seconds": skipped_seconds}
+
+        windows = _plan_windows(audio.num_samples, self.window_seconds, self.overlap_seconds)
+        # Only the path and sample range cross the process boundary; each pool process maps the PCM itself
+        window_segments = await asyncio.gather(*(
+            self._run(_transcribe_pcm_window, audio.pcm_path, start, end)
+            for start, end, _, _ in windows
+        ))
+        result = _stitch(window_segments, windows)
+
+        if speech_map:
+            for seg in result["segments"]:
+                seg["start"] = speech_map.to_original(seg["start"])
+                seg["end"] = speech_map.to_original(seg["end"])
+        result["skipped_seconds"] = skipped_seconds
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+transcription_engine = TranscriptionEngine(
+    backend=BackendConfig(
+        name=settings.TRANSCRIBE_BACKEND,
+        model_name=settings.WHISPER_MODEL,
+        compute_type=settings.WHISPER_COMPUTE_TYPE,
+        cpu_threads=settings.WHISPER_CPU_THREADS
+    ),
+    max_workers=settings.TRANSCRIBE_WORKERS,
+    window_seconds=settings.TRANSCRIBE_WINDOW_SECONDS,
+    overlap_seconds=settings.TRANSCRIBE_WINDOW_OVERLAP_SECONDS,
+    vad=VADConfig(
+        method=settings.VAD_METHOD,
+        speech_threshold=settings.VAD_SPEECH_THRESHOLD,
+        relative_threshold_db=settings.VAD_RELATIVE_THRESHOLD_DB,
+        min_silence_seconds=settings.VAD_MIN_SILENCE_SECONDS,
+        padding_seconds=settings.VAD_PADDING_SECONDS
+    ) if settings.VAD_ENABLED else None
+)
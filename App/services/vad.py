@@ -0,0 +1,153 @@
+"""
+Voice-activity detection.
+
+Finds speech in the extracted 16 kHz PCM, bridges short pauses and pads
+speech regions so words are not clipped. Speech regions are copied into a
+compact PCM file for transcription and SpeechMap converts timestamps on that
+compact timeline back to the original one.
+
+Two detectors:
+- "silero": the Silero speech model bundled with faster-whisper. It scores
+  speech itself, so music, noise and quiet recordings are told apart from
+  voice.
+- "energy": frame power relative to the file's own loud level. It is
+  dependency free, but loud non-speech (music) counts as speech.
+"""
+import bisect
+from dataclasses import dataclass, field
+
+FRAME_SECONDS = 0.03
+_BLOCK_FRAMES = 10_000  # frames scored per numpy pass, bounds peak memory
+_SILERO_BLOCK_SECONDS = 600  # audio handed to the Silero model per call, bounds peak memory
+_LOUD_PERCENTILE = 95  # the file's reference level for the energy detector
+_SILENCE_FLOOR_DB = -70.0  # frames below this are silence whatever the file's level
+
+
+@dataclass(frozen=True)
+class VADConfig:
+    method: str  # "silero" or "energy"
+    speech_threshold: float  # silero: speech probability
+    relative_threshold_db: float  # energy: dB below the file's loud level
+    min_silence_seconds: float
+    padding_seconds: float
+
+
+@dataclass
+class SpeechMap:
+    """(compact_start, original_start, length) in samples for each kept region"""
+    regions: list[tuple[int, int, int]]
+    total_samples: int
+    sample_rate: int
+    _compact_starts: list[int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._compact_starts = [compact for compact, _, _ in self.regions]
+
+    @property
+    def speech_samples(self) -> int:
+        return sum(length for _, _, length in self.regions)
+
+    @property
+    def skipped_seconds(self) -> float:
+        return (self.total_samples - self.speech_samples) / self.sample_rate
+
+    def to_original(self, seconds: float) -> float:
+        """Map a time on the compact (speech only) timeline to the original audio"""
+        if not self.regions:
+            return seconds
+        sample = seconds * self.sample_rate
+        i = max(0, bisect.bisect_right(self._compact_starts, sample) - 1)
+        compact_start, original_start, length = self.regions[i]
+        offset = min(max(sample - compact_start, 0), length)
+        return (original_start + offset) / self.sample_rate
+
+
+def detect_speech(audio, sample_rate: int, config: VADConfig) -> list[tuple[int, int]]:
+    """Return merged, padded [start, end) sample ranges that contain speech"""
+    if config.method == "silero":
+        runs = _silero_runs(audio, sample_rate, config)
+    elif config.method == "energy":
+        runs = _energy_runs(audio, sample_rate, config)
+    else:
+        raise ValueError(f"Unknown VAD method: {config.method}")
+    return _merge_runs(runs, len(audio), sample_rate, config)
+
+
+def _silero_runs(audio, sample_rate: int, config: VADConfig) -> list[tuple[int, int]]:
+    """Speech sample ranges from Silero, run block by block over the memory-mapped PCM"""
+    import numpy as np
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    # Pauses and padding are handled by _merge_runs, across block boundaries too
+    options = VadOptions(threshold=config.speech_threshold, min_silence_duration_ms=0, speech_pad_ms=0)
+    block = int(_SILERO_BLOCK_SECONDS * sample_rate)
+    runs = []
+    for offset in range(0, len(audio), block):
+        samples = np.ascontiguousarray(audio[offset:offset + block], dtype=np.float32)
+        runs.extend(
+            (offset + ts["start"], offset + ts["end"])
+            for ts in get_speech_timestamps(samples, options)  # 16 kHz, the only rate it takes
+        )
+    return runs
+
+
+def _energy_runs(audio, sample_rate: int, config: VADConfig) -> list[tuple[int, int]]:
+    """
+    Sample ranges of frames within relative_threshold_db of the file's loud
+    level (its 95th percentile frame power), so quiet recordings keep their
+    speech; digital silence never counts.
+    """
+    import numpy as np
+
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    power = np.empty(n_frames, dtype=np.float32)
+    for i in range(0, n_frames, _BLOCK_FRAMES):
+        j = min(i + _BLOCK_FRAMES, n_frames)
+        block = np.asarray(audio[i * frame:j * frame], dtype=np.float32).reshape(-1, frame)
+        power[i:j] = np.mean(np.square(block), axis=1)
+
+    # Thresholds on mean power (dB / 10), not amplitude
+    level = np.percentile(power, _LOUD_PERCENTILE)
+    threshold = max(level * 10 ** (config.relative_threshold_db / 10), 10 ** (_SILENCE_FLOOR_DB / 10))
+    voiced = power > threshold
+
+    # Run boundaries of voiced frames
+    padded = np.concatenate(([False], voiced, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return [(int(start) * frame, int(end) * frame) for start, end in zip(edges[0::2], edges[1::2])]
+
+
+def _merge_runs(runs: list[tuple[int, int]], total: int, sample_rate: int, config: VADConfig) -> list[tuple[int, int]]:
+    """Pad speech runs and bridge pauses shorter than min_silence_seconds"""
+    min_gap = int(config.min_silence_seconds * sample_rate)
+    pad = int(config.padding_seconds * sample_rate)
+    regions: list[tuple[int, int]] = []
+    prev_end = 0
+    for run_start, run_end in sorted(runs):
+        start = max(0, run_start - pad)
+        end = min(total, run_end + pad)
+        # Bridge short pauses and overlapping padding
+        if regions and (run_start - prev_end <= min_gap or start <= regions[-1][1]):
+            regions[-1] = (regions[-1][0], max(end, regions[-1][1]))
+        else:
+            regions.append((start, end))
+        prev_end = run_end
+    return regions
+
+
+def compact_speech(audio, regions: list[tuple[int, int]], out_path: str, sample_rate: int) -> SpeechMap:
+    """Write only the speech regions to out_path and return the offset map"""
+    import numpy as np
+
+    mapped = []
+    compact = 0
+    with open(out_path, "wb") as f:
+        for start, end in regions:
+            np.asarray(audio[start:end], dtype=np.float32).tofile(f)
+            mapped.append((compact, start, end - start))
+            compact += end - start
+    return SpeechMap(regions=mapped, total_samples=len(audio), sample_rate=sample_rate)
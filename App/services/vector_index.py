@@ -0,0 +1,464 @@
+"""
+Memory-mapped on-disk vector index.
+
+An optional alternative to pgvector search for single-node deployments
+(LOCAL_VECTOR_INDEX=true). Each index is a directory of immutable segments:
+
+    <LOCAL_VECTOR_INDEX_DIR>/<name>/<stem>.f32   float32 rows, `dim` per row
+    <LOCAL_VECTOR_INDEX_DIR>/<name>/<stem>.ids   16-byte UUID per row
+    <LOCAL_VECTOR_INDEX_DIR>/<name>/<stem>.<q>   compact codes (VECTOR_QUANTIZATION)
+
+With quantization, search scans only the compact codes (float16, int8 with a
+per-row scale, or sign bits) and re-ranks VECTOR_RERANK_FACTOR candidates per
+result against the float32 rows, so only their pages of the .f32 file are read.
+
+Writes append a new segment; the same id written again supersedes its older
+rows (last write wins). Opening an index only maps the files, so startup does
+not read the vectors. Compaction is size-tiered and runs in the background
+(compact_periodically): adjacent segments of comparable size are merged
+pairwise, so there are O(log n) segments, each row is rewritten O(log n)
+times and writes never wait for a merge.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable
+from uuid import UUID
+import numpy as np
+from App.core.config import settings
+
+DIM = 1536
+ID_BYTES = 16
+SCAN_ROWS = 65536  # rows scored per matrix-vector product
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+logger = logging.getLogger(__name__)
+
+
+def _code_dtype(quantization: str, dim: int) -> np.dtype:
+    if quantization == "halfvec":
+        return np.dtype((np.float16, (dim,)))
+    if quantization == "int8":
+        return np.dtype([("scale", np.float32), ("codes", np.int8, (dim,))])
+    return np.dtype((np.uint8, (dim // 8,)))  # binary: one sign bit per dimension
+
+
+def _encode(quantization: str, vectors: np.ndarray) -> np.ndarray:
+    if quantization == "halfvec":
+        return vectors.astype(np.float16)
+    if quantization == "int8":
+        codes = np.empty(len(vectors), dtype=_code_dtype("int8", vectors.shape[1]))
+        scale = np.abs(vectors).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        codes["scale"] = scale
+        codes["codes"] = np.round(vectors / scale[:, None])
+        return codes
+    return np.packbits(vectors > 0, axis=1)
+
+
+class _Segment:
+    def __init__(self, stem: str, vectors: np.ndarray, ids: np.ndarray, codes: np.ndarray | None = None):
+        self.stem = stem
+        self.vectors = vectors  # memmap (n, dim) float32
+        self.ids = ids  # memmap (n,) V16
+        self.codes = codes  # memmap of quantized rows, None without quantization
+        self._norms: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def norms(self) -> np.ndarray:
+        if self._norms is None:
+            self._norms = np.concatenate([
+                np.linalg.norm(self.vectors[i:i + SCAN_ROWS], axis=1)
+                for i in range(0, len(self), SCAN_ROWS)
+            ]) if len(self) else np.empty(0, np.float32)
+        return self._norms
+
+
+class LocalVectorIndex:
+    def __init__(self, name: str, dim: int = DIM, directory: str | None = None):
+        self.dim = dim
+        self.quantization = settings.VECTOR_QUANTIZATION
+        self.path = os.path.join(directory or settings.LOCAL_VECTOR_INDEX_DIR, name)
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segments: list[_Segment] = []
+        self._live: list[np.ndarray] = []  # per segment: rows not superseded later
+
+    # ---------- files ----------
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False, name: str = ".lock", blocking: bool = True):
+        """
+        Cross-process flock. The default lock is held exclusively to commit or
+        delete segments and shared while listing and opening them, so readers
+        never see a segment disappear half way. Yields False when a
+        non-blocking lock is taken elsewhere.
+        """
+        flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+        with open(os.path.join(self.path, name), "a") as f:
+            try:
+                fcntl.flock(f, flags)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stems(self) -> list[str]:
+        """Committed segments, oldest first (the .f32 rename is the commit point)"""
+        return sorted(
+            name[:-4] for name in os.listdir(self.path)
+            if name.endswith(".f32") and os.path.exists(os.path.join(self.path, name[:-4] + ".ids"))
+        )
+
+    def _open(self, stem: str) -> _Segment:
+        base = os.path.join(self.path, stem)
+        rows = os.path.getsize(base + ".ids") // ID_BYTES
+        code_dtype = None if self.quantization == "none" else _code_dtype(self.quantization, self.dim)
+        if rows == 0:
+            codes = None if code_dtype is None else np.empty(0, code_dtype)
+            return _Segment(stem, np.empty((0, self.dim), np.float32), np.empty(0, "V16"), codes)
+
+        vectors = np.memmap(base + ".f32", dtype=np.float32, mode="r", shape=(rows, self.dim))
+        ids = np.memmap(base + ".ids", dtype="V16", mode="r", shape=(rows,))
+        codes = None
+        if code_dtype is not None:
+            code_path = f"{base}.{self.quantization}"
+            if not os.path.exists(code_path):
+                # Segment written before this quantization was enabled
+                self._write_file(code_path, _encode(self.quantization, np.asarray(vectors)))
+            codes = np.memmap(code_path, dtype=code_dtype, mode="r", shape=(rows,))
+        return _Segment(stem, vectors, ids, codes)
+
+    @staticmethod
+    def _write_file(path: str, array: np.ndarray) -> None:
+        # Per-writer temp name: readers may generate the same code file concurrently
+        tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _write_segment(self, stem: str, ids: np.ndarray, vectors: np.ndarray) -> None:
+        base = os.path.join(self.path, stem)
+        self._write_file(base + ".ids", ids)
+        if self.quantization != "none":
+            self._write_file(f"{base}.{self.quantization}", _encode(self.quantization, vectors))
+        self._write_file(base + ".f32", vectors)  # commit point
+
+    def refresh(self) -> None:
+        """Pick up segments added or compacted away, by this or another process"""
+        with self._lock:
+            segments = self._load_segments(self._segments)
+            if segments is not self._segments:
+                self._segments = segments
+                self._live = self._live_masks(segments)
+
+    def _load_segments(self, current: list[_Segment]) -> list[_Segment]:
+        """Committed segments, reusing the open ones; `current` itself when nothing changed"""
+        # Open files stay readable after a merge deletes them, so the lock is only needed until mapped
+        with self._file_lock(shared=True):
+            stems = self._stems()
+            if stems == [s.stem for s in current]:
+                return current
+            known = {s.stem: s for s in current}
+            return [known.get(stem) or self._open(stem) for stem in stems]
+
+    @staticmethod
+    def _live_masks(segments: list[_Segment]) -> list[np.ndarray]:
+        """Mark the last occurrence of every id across all segments"""
+        if not segments:
+            return []
+        all_ids = np.concatenate([np.asarray(s.ids) for s in segments])
+        _, first_in_reversed = np.unique(all_ids[::-1], return_index=True)
+        live = np.zeros(len(all_ids), dtype=bool)
+        live[len(all_ids) - 1 - first_in_reversed] = True
+        offsets = np.cumsum([0] + [len(s) for s in segments])
+        return [live[offsets[i]:offsets[i + 1]] for i in range(len(segments))]
+
+    # ---------- writes ----------
+
+    def add(self, ids: Iterable[UUID], vectors) -> None:
+        """Append (or overwrite) vectors as one new segment"""
+        with self._file_lock():
+            self._append_locked(ids, vectors)
+        self.refresh()
+
+    def fill_if_empty(self, batches: Iterable[tuple[list[UUID], list]]) -> bool:
+        """
+        Write each (ids, vectors) batch as a segment, only if the index has no
+        segments yet. The lock is held from the check to the last batch, so of
+        several processes starting together exactly one fills the index.
+        """
+        with self._file_lock():
+            if self._stems():
+                return False
+            for ids, vectors in batches:
+                self._append_locked(ids, vectors)
+        self.refresh()
+        return True
+
+    def _append_locked(self, ids: Iterable[UUID], vectors) -> None:
+        id_bytes = np.array([row_id.bytes for row_id in ids], dtype="V16")
+        if not len(id_bytes):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(id_bytes), self.dim)
+        self._write_segment(f"{time.time_ns():020d}-{os.getpid()}", id_bytes, vectors)
+
+    @staticmethod
+    def _merge_run(segments: list[_Segment]) -> tuple[int, int] | None:
+        """
+        [start, stop) of the next two adjacent segments to merge, newest first,
+        or None. Uses Timsort's run invariants: every segment holds more rows
+        than the next newer one, and more than the next two together. Small
+        segments are merged with each other long before an old large one is
+        rewritten, sizes grow at least like Fibonacci numbers so there are
+        O(log n) segments, and a row is rewritten O(log n) times.
+        """
+        sizes = [len(s) for s in segments]
+        for i in range(len(sizes) - 1, 0, -1):
+            if i >= 2 and sizes[i - 2] <= sizes[i - 1] + sizes[i]:
+                # Merge the middle one with its smaller neighbour
+                return (i - 2, i) if sizes[i - 2] < sizes[i] else (i - 1, i + 1)
+            if sizes[i - 1] <= sizes[i]:
+                return i - 1, i + 1
+        return None
+
+    def maybe_compact(self) -> int:
+        """
+        Merge adjacent segments of comparable size until none is left; returns the
+        number of merges. Runs in the background: the merged segment is written
+        without blocking add() (its rows duplicate the inputs, and the last copy
+        of an id wins either way), and the inputs are deleted under the lock.
+        """
+        merges = 0
+        with self._file_lock(name=".compact", blocking=False) as acquired:
+            if not acquired:
+                return 0  # another process is compacting
+            while True:
+                segments = self._load_segments([])
+                run = self._merge_run(segments)
+                if run is None:
+                    break
+                self._merge(segments, *run)
+                merges += 1
+        if merges:
+            self.refresh()
+        return merges
+
+    def compact(self) -> None:
+        """Merge every segment into one"""
+        with self._file_lock(name=".compact"):
+            segments = self._load_segments([])
+            if len(segments) > 1:
+                self._merge(segments, 0, len(segments))
+        self.refresh()
+
+    def _merge(self, segments: list[_Segment], start: int, stop: int) -> None:
+        """Rewrite the live rows of segments[start:stop] into one segment sorting right after the newest of them"""
+        live = self._live_masks(segments)[start:stop]
+        run = segments[start:stop]
+        ids = np.concatenate([np.asarray(s.ids)[mask] for s, mask in zip(run, live)])
+        vectors = np.concatenate([np.asarray(s.vectors)[mask] for s, mask in zip(run, live)])
+
+        self._write_segment(run[-1].stem + "c", ids, vectors)
+        with self._file_lock():
+            for segment in run:
+                for name in os.listdir(self.path):
+                    if name.startswith(segment.stem + "."):
+                        os.remove(os.path.join(self.path, name))
+
+    # ---------- reads ----------
+
+    def __len__(self) -> int:
+        self.refresh()
+        return int(sum(mask.sum() for mask in self._live))
+
+    def is_empty(self) -> bool:
+        with self._file_lock(shared=True):
+            return not self._stems()
+
+    def items(self) -> tuple[list[UUID], np.ndarray]:
+        """All live (ids, vectors); copies the vectors into memory"""
+        self.refresh()
+        with self._lock:
+            segments, live = list(self._segments), list(self._live)
+        ids = [UUID(bytes=bytes(b)) for s, mask in zip(segments, live) for b in np.asarray(s.ids)[mask]]
+        vectors = (
+            np.concatenate([np.asarray(s.vectors)[mask] for s, mask in zip(segments, live)])
+            if segments else np.empty((0, self.dim), np.float32)
+        )
+        return ids, vectors
+
+    def search(self, query_vector, top_k: int = 5, exact: bool = False) -> list[tuple[UUID, float, float]]:
+        """
+        Top-k by L2 distance (same order as pgvector <->): (id, distance, cosine similarity).
+        With quantization, candidates come from the compact codes and are re-ranked exactly;
+        `exact` scans the float32 rows instead (e.g. to measure recall).
+        """
+        self.refresh()
+        with self._lock:
+            segments, live = list(self._segments), list(self._live)
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        if exact or self.quantization == "none":
+            return self._exact_search(segments, live, query, top_k)
+        candidates = self._candidates(segments, live, query, top_k * settings.VECTOR_RERANK_FACTOR)
+        return self._rerank(segments, query, candidates, top_k)
+
+    @staticmethod
+    def _exact_search(segments, live, query: np.ndarray, top_k: int) -> list[tuple[UUID, float, float]]:
+        query_norm = float(np.linalg.norm(query))
+        best_ids, best_dist, best_cos = [], [], []
+
+        for segment, mask in zip(segments, live):
+            norms = segment.norms
+            for start in range(0, len(segment), SCAN_ROWS):
+                stop = min(start + SCAN_ROWS, len(segment))
+                dots = segment.vectors[start:stop] @ query
+                n = norms[start:stop]
+                dist = np.sqrt(np.maximum(n ** 2 + query_norm ** 2 - 2 * dots, 0.0))
+                dist[~mask[start:stop]] = np.inf
+
+                k = min(top_k, len(dist))
+                top = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(len(dist))
+                top = top[np.isfinite(dist[top])]
+                denom = n[top] * query_norm
+                best_ids.append(segment.ids[start:stop][top])
+                best_dist.append(dist[top])
+                best_cos.append(np.divide(dots[top], denom, out=np.zeros(len(top), np.float32), where=denom > 0))
+
+        if not best_ids:
+            return []
+        ids, dist, cos = np.concatenate(best_ids), np.concatenate(best_dist), np.concatenate(best_cos)
+        order = np.argsort(dist, kind="stable")[:top_k]
+        return [(UUID(bytes=bytes(ids[i])), float(dist[i]), float(cos[i])) for i in order]
+
+    def _approx_scores(self, codes: np.ndarray, query: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+        """Score rows from their codes; lower is closer (L2 up to a constant, or Hamming)"""
+        if self.quantization == "halfvec":
+            x = codes.astype(np.float32)
+            return np.einsum("ij,ij->i", x, x) - 2 * (x @ query)
+        if self.quantization == "int8":
+            x = codes["codes"].astype(np.float32)
+            scale = codes["scale"]
+            return np.einsum("ij,ij->i", x, x) * scale ** 2 - 2 * (x @ query) * scale
+        return POPCOUNT[np.bitwise_xor(codes, query_bits)].sum(axis=1, dtype=np.float32)
+
+    def _candidates(self, segments, live, query: np.ndarray, count: int) -> list[tuple[int, int]]:
+        """(segment, row) of the `count` closest live rows by their codes"""
+        query_bits = np.packbits(query > 0)
+        best_seg, best_row, best_score = [], [], []
+
+        for seg_no, (segment, mask) in enumerate(zip(segments, live)):
+            for start in range(0, len(segment), SCAN_ROWS):
+                stop = min(start + SCAN_ROWS, len(segment))
+                scores = self._approx_scores(segment.codes[start:stop], query, query_bits)
+                scores[~mask[start:stop]] = np.inf
+
+                k = min(count, len(scores))
+                top = np.argpartition(scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+                top = top[np.isfinite(scores[top])]
+                best_seg.append(np.full(len(top), seg_no))
+                best_row.append(top + start)
+                best_score.append(scores[top])
+
+        if not best_seg:
+            return []
+        seg, row, score = np.concatenate(best_seg), np.concatenate(best_row), np.concatenate(best_score)
+        order = np.argsort(score, kind="stable")[:count]
+        return list(zip(seg[order].tolist(), row[order].tolist()))
+
+    @staticmethod
+    def _rerank(segments, query: np.ndarray, candidates: list[tuple[int, int]], top_k: int) -> list[tuple[UUID, float, float]]:
+        """Exact distances for the candidates; reads only their float32 rows"""
+        query_norm = float(np.linalg.norm(query))
+        hits = []
+        for seg_no in sorted({seg for seg, _ in candidates}):
+            segment = segments[seg_no]
+            rows = np.array(sorted(row for seg, row in candidates if seg == seg_no))
+            vectors = np.asarray(segment.vectors[rows])
+            dots = vectors @ query
+            norms = np.linalg.norm(vectors, axis=1)
+            dist = np.sqrt(np.maximum(norms ** 2 + query_norm ** 2 - 2 * dots, 0.0))
+            denom = norms * query_norm
+            cos = np.divide(dots, denom, out=np.zeros(len(rows), np.float32), where=denom > 0)
+            hits.extend(
+                (UUID(bytes=bytes(segment.ids[row])), float(d), float(c))
+                for row, d, c in zip(rows, dist, cos)
+            )
+        hits.sort(key=lambda hit: hit[1])
+        return hits[:top_k]
+
+
+_indexes: dict[str, LocalVectorIndex] = {}
+
+
+def get_vector_index(name: str) -> LocalVectorIndex | None:
+    """Process-wide index for `video_chunks` or `embeddings`, or None when disabled"""
+    if not settings.LOCAL_VECTOR_INDEX:
+        return None
+    if name not in _indexes:
+        _indexes[name] = LocalVectorIndex(name)
+    return _indexes[name]
+
+
+def compact_vector_indexes() -> None:
+    """One size-tiered compaction pass over every index"""
+    for name in ("video_chunks", "embeddings"):
+        index = get_vector_index(name)
+        if index is None:
+            continue
+        try:
+            merges = index.maybe_compact()
+            if merges:
+                logger.info(f"Vector index {name}: {merges} segment merge(s)")
+        except Exception as e:
+            logger.error(f"Vector index {name} compaction failed: {e}")
+
+
+async def compact_periodically() -> None:
+    """Background task: compact every LOCAL_VECTOR_INDEX_COMPACT_SECONDS, off the request path"""
+    while True:
+        await asyncio.sleep(settings.LOCAL_VECTOR_INDEX_COMPACT_SECONDS)
+        await asyncio.to_thread(compact_vector_indexes)
+
+
+def backfill_vector_indexes(db) -> None:
+    """Fill empty indexes from the database, e.g. when enabling them on existing data"""
+    from App.models.chunk import VideoChunk
+    from App.models.embedding import Embedding
+
+    for name, id_column, vector_column in (
+        ("video_chunks", VideoChunk.id, VideoChunk.embedding),
+        ("embeddings", Embedding.chat_id, Embedding.vector),
+    ):
+        index = get_vector_index(name)
+        if index is None or not index.is_empty():
+            continue
+        query = db.query(id_column, vector_column).filter(vector_column.isnot(None))
+        if index.fill_if_empty(_batches(query)):
+            logger.info(f"Vector index {name} backfilled ({len(index)} rows)")
+
+
+def _batches(query):
+    """(ids, vectors) batches of SCAN_ROWS rows, read lazily"""
+    batch_ids, batch_vectors = [], []
+    for row_id, vector in query.yield_per(SCAN_ROWS):
+        batch_ids.append(row_id)
+        batch_vectors.append(vector)
+        if len(batch_ids) == SCAN_ROWS:
+            yield batch_ids, batch_vectors
+            batch_ids, batch_vectors = [], []
+    yield batch_ids, batch_vectors
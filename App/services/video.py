@@ -1,66 +1,51 @@
+import asyncio
+import json
+import logging
+import os
+import random
 import tempfile
-from fastapi.concurrency import run_in_threadpool
-from moviepy.editor import VideoFileClip
-import whisper
-from App.services.llm import LLMService
+from App.services.llm import get_llm_service
+from App.services.transcription import transcription_engine, extract_audio
 from App.repositories import video as video_repo
-from App.client.supabase import SupabaseStorage
+from App.core.config import settings
 
-llm_service = LLMService()
-whisper_model = whisper.load_model("base")
+logger = logging.getLogger(__name__)
 
 
 class VideoService:
 
     @staticmethod
-    async def upload_and_process_video(db, file_bytes, filename, title, user_id):
-        storage = SupabaseStorage()
-
-        # Upload video to Supabase
-        public_url = storage.upload_video(file_bytes, filename, user_id)
-
-        # Save to temporary file to work with Whisper & moviepy
-        with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
-            tmp.write(file_bytes)
-            tmp.flush()
+    async def process_video(db, media_path, video_url, title, user_id):
+        """Run transcription, summaries and embeddings for an already stored video file on local disk."""
+        # Decode the media to PCM once; duration and transcript both come from it
+        with tempfile.TemporaryDirectory() as tmpdir:
+            audio = await extract_audio(media_path, os.path.join(tmpdir, "audio.f32"))
+            video_duration = audio.duration
+            result = await transcription_engine.transcribe(audio)
+            transcript = result.get("text", "").strip()
+            segments = result.get("segments", [])
+            skipped_seconds = result.get("skipped_seconds", 0.0)
 
-            # Get actual video duration
-            clip = VideoFileClip(tmp.name)
-            video_duration = clip.duration  # seconds as float
+        logger.info(
+            f"Transcribed '{title}': {video_duration:.1f}s audio, "
+            f"{skipped_seconds:.1f}s skipped as silence"
+        )
 
-            # Transcribe video
-            result = whisper_model.transcribe(tmp.name)
-            transcript = result.get("text", "").strip()
+        # Summaries, description and embeddings first; nothing is written until all of them succeed
+        description, chunks = await VideoService._process_transcript(transcript, video_duration, segments)
 
-        # Save Video record
+        # Video and chunks in one transaction, so a failed attempt leaves nothing to clean up on retry
         from App.models.video import Video
         video = Video(
             title=title,
             owner_id=user_id,
-            video_url=public_url,
-            transcript=transcript
+            video_url=video_url,
+            transcript=transcript,
+            description=description,
+            duration=video_duration,
+            skipped_audio_seconds=skipped_seconds
         )
-        db.add(video)
-        db.commit()
-        db.refresh(video)
-
-        # Split transcript into chunks and create embeddings + summaries
-        await VideoService._process_transcript(db, video, transcript, video_duration)
-
-        db.refresh(video)
-
-        return video
-
-    @staticmethod
-    async def _transcribe(file_bytes: bytes) -> str:
-        """Transcribe video using Whisper."""
-        def _run():
-            with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
-                tmp.write(file_bytes)
-                tmp.flush()
-                result = whisper_model.transcribe(tmp.name)
-                return result.get("text", "").strip()
-        return await run_in_threadpool(_run)
+        return await video_repo.create_video_with_chunks(db, video, chunks)
 
     @staticmethod
     def _split_into_chunks(text: str, chunk_size: int = 80):
@@ -71,38 +56,180 @@ class VideoService:
         return chunks
 
     @staticmethod
-    async def _process_transcript(db, video, transcript: str, video_duration: float):
-        # Generate video description
-        description = await llm_service.chat([
-            {"role": "user", "content": f"Summarize this video in 3 sentences:\n\n{transcript}"}
-        ])
-        await video_repo.update_video_info(db, video.id, transcript, description)
-
-        # Split transcript into chunks
-        chunks = VideoService._split_into_chunks(transcript)
-        num_chunks = len(chunks)
-        chunk_length = video_duration / max(1, num_chunks)  # duration per chunk
-
-        for idx, chunk in enumerate(chunks):
-            # Short summary of chunk
-            summary = await llm_service.chat([
-                {"role": "user", "content": f"Give one short main idea sentence:\n\n{chunk}"}
+    def _split_segments_into_chunks(segments: list[dict], chunk_size: int = 80) -> list[tuple[str, float, float]]:
+        """
+        Split timed transcript segments into chunk_size-word chunks with real
+        (start, end) times. Words are spread evenly within their own segment,
+        so gaps removed before transcription never shift a chunk.
+        """
+        timed_words = []
+        for seg in segments:
+            words = seg["text"].split()
+            if not words:
+                continue
+            step = (seg["end"] - seg["start"]) / len(words)
+            for i, word in enumerate(words):
+                timed_words.append((word, seg["start"] + i * step, seg["start"] + (i + 1) * step))
+
+        chunks = []
+        for i in range(0, len(timed_words), chunk_size):
+            group = timed_words[i:i + chunk_size]
+            chunks.append((" ".join(w for w, _, _ in group), group[0][1], group[-1][2]))
+        return chunks
+
+    @staticmethod
+    async def _summarize_chunk(chunk: str, semaphore: asyncio.Semaphore) -> str | None:
+        """Short summary of one chunk; retried with backoff, then left as None so the video still completes"""
+        attempts = settings.SUMMARY_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                async with semaphore:
+                    return await get_llm_service().chat([
+                        {"role": "user", "content": f"Give one short main idea sentence:\n\n{chunk}"}
+                    ])
+            except Exception as e:
+                logger.warning(f"Chunk summary failed (attempt {attempt}): {e}")
+                if attempt < attempts:
+                    # Exponential backoff with full jitter, outside the semaphore, so a 429 burst spreads out
+                    ceiling = min(settings.SUMMARY_RETRY_MAX_SECONDS, settings.SUMMARY_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+                    await asyncio.sleep(random.uniform(0, ceiling))
+        return None
+
+    @staticmethod
+    def _parse_summary_array(reply: str, expected: int) -> list[str] | None:
+        """Parse a JSON array of `expected` strings out of an LLM reply, or None if malformed"""
+        start, end = reply.find("["), reply.rfind("]")
+        if start == -1 or end <= start:
+            return None
+        try:
+            summaries = json.loads(reply[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        if (
+            not isinstance(summaries, list)
+            or len(summaries) != expected
+            or not all(isinstance(x, str) and x.strip() for x in summaries)
+        ):
+            return None
+        return [x.strip() for x in summaries]
+
+    @staticmethod
+    async def _summarize_chunk_group(group: list[str], semaphore: asyncio.Semaphore) -> list[str | None]:
+        """Summarize several chunks in one request; fall back to one call per chunk on bad output"""
+        if len(group) == 1:
+            return [await VideoService._summarize_chunk(group[0], semaphore)]
+
+        numbered = "\n\n".join(f"[{i + 1}]\n{chunk}" for i, chunk in enumerate(group))
+        prompt = (
+            f"Below are {len(group)} numbered transcript chunks. "
+            f"For each chunk give one short main idea sentence.\n"
+            f"Reply with ONLY a JSON array of exactly {len(group)} strings, in chunk order.\n\n"
+            f"{numbered}"
+        )
+        try:
+            async with semaphore:
+                reply = await get_llm_service().chat([{"role": "user", "content": prompt}])
+            summaries = VideoService._parse_summary_array(reply, len(group))
+            if summaries is not None:
+                return summaries
+            logger.warning(f"Malformed multi-chunk summary for {len(group)} chunks, falling back")
+        except Exception as e:
+            logger.warning(f"Multi-chunk summary failed, falling back: {e}")
+
+        return await asyncio.gather(
+            *(VideoService._summarize_chunk(chunk, semaphore) for chunk in group)
+        )
+
+    @staticmethod
+    async def _summarize_chunks(chunks: list[str]) -> list[str | None]:
+        """
+        Summarize all chunks concurrently, keeping chunk order.
+        SUMMARY_CHUNKS_PER_REQUEST chunks are packed into each LLM request.
+        """
+        semaphore = asyncio.Semaphore(settings.SUMMARY_MAX_CONCURRENCY)
+        group_size = max(1, settings.SUMMARY_CHUNKS_PER_REQUEST)
+        groups = [chunks[i:i + group_size] for i in range(0, len(chunks), group_size)]
+        results = await asyncio.gather(
+            *(VideoService._summarize_chunk_group(group, semaphore) for group in groups)
+        )
+        return [summary for group in results for summary in group]
+
+    @staticmethod
+    async def _reduce_to_description(points: list[str]) -> str | None:
+        """
+        Reduce step of the video description: merge chunk summaries in groups of
+        DESCRIPTION_REDUCE_FANOUT until one prompt's worth is left, then write
+        the final description. Cost is bounded regardless of transcript length.
+        """
+        if not points:
+            return None
+
+        fanout = max(2, settings.DESCRIPTION_REDUCE_FANOUT)
+        semaphore = asyncio.Semaphore(settings.SUMMARY_MAX_CONCURRENCY)
+
+        async def _merge(group: list[str]) -> str:
+            bullet_list = "\n".join(f"- {p}" for p in group)
+            async with semaphore:
+                return await get_llm_service().chat([
+                    {"role": "user", "content": f"Combine these consecutive points from a video into one short paragraph:\n\n{bullet_list}"}
+                ])
+
+        try:
+            while len(points) > fanout:
+                groups = [points[i:i + fanout] for i in range(0, len(points), fanout)]
+                points = await asyncio.gather(*(_merge(group) for group in groups))
+
+            joined = "\n".join(f"- {p}" for p in points)
+            return await get_llm_service().chat([
+                {"role": "user", "content": f"Summarize this video in 3 sentences, based on these notes in order:\n\n{joined}"}
             ])
-            # Embedding
-            emb = await llm_service.emb([chunk])
-            vector = emb[0]
-
-            # Actual start/end timestamps
-            start = idx * chunk_length
-            end = min((idx + 1) * chunk_length, video_duration)
-
-            await video_repo.create_chunk(
-                db,
-                video.id,
-                idx,
-                chunk,
-                summary,
-                start,
-                end,
-                vector
-            )
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"Video description failed: {e}")
+            return None
+
+    @staticmethod
+    async def _summarize_and_describe(chunks: list[str]) -> tuple[list[str | None], str | None]:
+        """Map (chunk summaries) then reduce (video description)"""
+        summaries = await VideoService._summarize_chunks(chunks)
+        # Chunks whose summary failed contribute their own (short) text to the reduce step
+        points = [summary or chunk for chunk, summary in zip(chunks, summaries)]
+        description = await VideoService._reduce_to_description(points)
+        return summaries, description
+
+    @staticmethod
+    async def _process_transcript(
+        transcript: str,
+        video_duration: float,
+        segments: list[dict] | None = None
+    ) -> tuple[str | None, list[dict]]:
+        """Video description and the chunk rows (text, timing, summary, embedding) of a transcript"""
+        # Split transcript into chunks with start/end timestamps
+        if segments:
+            timed_chunks = VideoService._split_segments_into_chunks(segments)
+        else:
+            # No segment timing available: spread chunks evenly over the video
+            text_chunks = VideoService._split_into_chunks(transcript)
+            chunk_length = video_duration / max(1, len(text_chunks))  # duration per chunk
+            timed_chunks = [
+                (chunk, idx * chunk_length, min((idx + 1) * chunk_length, video_duration))
+                for idx, chunk in enumerate(text_chunks)
+            ]
+        chunks = [chunk for chunk, _, _ in timed_chunks]
+
+        # Summaries -> description (map-reduce) and batched embeddings run side by side
+        (summaries, description), vectors = await asyncio.gather(
+            VideoService._summarize_and_describe(chunks),
+            get_llm_service().emb_batched(chunks)
+        )
+
+        return description, [
+            {
+                "chunk_index": idx,
+                "content": chunk,
+                "summary": summary,
+                "start_time": start,
+                "end_time": end,
+                "embedding": vector
+            }
+            for idx, ((chunk, start, end), summary, vector) in enumerate(zip(timed_chunks, summaries, vectors))
+        ]
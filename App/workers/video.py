@@ -0,0 +1,179 @@
+"""
+Video ingestion worker.
+
+Claims queued jobs from the `video_jobs` table and runs the full
+VideoService pipeline outside the API process. Start one process per core
+or node to scale ingestion:
+
+    python -m App.workers.video
+"""
+import asyncio
+import logging
+import os
+import socket
+import tempfile
+
+from App.core.config import settings
+from App.db.session import SessionLocal, SupabaseSession
+# Import every model so relationships resolve without the API routers
+from App.models import User, Item, Chat, Message  # noqa: F401
+from App.models.embedding import Embedding  # noqa: F401
+from App.models.video import Video  # noqa: F401
+from App.models.chunk import VideoChunk  # noqa: F401
+from App.models.job import VideoJob  # noqa: F401
+from App.models.media import MediaObject, MediaLink  # noqa: F401
+from App.repositories import job as job_repo
+from App.repositories import media as media_repo
+from App.client.storage import get_storage, close_storage
+from App.services.media import hash_file
+from App.services.llm import close_llm_service
+
+logger = logging.getLogger(__name__)
+
+
+def _new_session():
+    """Open a session on the primary database, mirroring get_db()"""
+    if settings.DB_MODE == "supabase":
+        if SupabaseSession is None:
+            raise ValueError("Supabase not configured")
+        return SupabaseSession()
+    return SessionLocal()
+
+
+async def run_job(db, job, storage) -> None:
+    from App.services.video import VideoService
+
+    try:
+        # Same content may have been processed since this job was queued
+        media = await media_repo.get_media(db, job.media_id) if job.media_id else None
+        if media and media.video_id:
+            await _complete(db, job, media.video_id)
+            logger.info(f"Video job {job.id} reused video {media.video_id} (duplicate content)")
+            return
+        if media and await _defer_if_running(db, job, media.id):
+            return
+
+        with tempfile.TemporaryDirectory(dir=settings.UPLOAD_SPOOL_DIR) as tmpdir:
+            # Co-located storage is read in place; remote storage is downloaded once
+            media_path = storage.local_path("video", job.storage_path)
+            if media_path is None:
+                media_path = os.path.join(tmpdir, "media")
+                await storage.adownload_to("video", job.storage_path, media_path)
+
+            if media is None:
+                # Direct (presigned) uploads are only hashed here, after download
+                sha256 = await asyncio.to_thread(hash_file, media_path)
+                media = await media_repo.get_media_by_hash(db, "video", sha256)
+                if media is None:
+                    media = await media_repo.create_media(
+                        db, "video", sha256, job.storage_path, job.video_url,
+                        size_bytes=os.path.getsize(media_path)
+                    )
+                await media_repo.link_media_owner(db, media.id, job.owner_id, job.filename)
+                await job_repo.set_video_job_media(db, job.id, media.id)
+                if media.video_id:
+                    await _complete(db, job, media.video_id)
+                    logger.info(f"Video job {job.id} reused video {media.video_id} (duplicate content)")
+                    return
+                if await _defer_if_running(db, job, media.id):
+                    return
+
+            video = await VideoService.process_video(
+                db,
+                media_path=media_path,
+                video_url=job.video_url,
+                title=job.title,
+                user_id=str(job.owner_id)
+            )
+        await media_repo.set_media_video(db, media.id, video.id)
+        await _complete(db, job, video.id)
+        logger.info(f"Video job {job.id} done (video {video.id})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Video job {job.id} failed (attempt {job.attempts}): {e}")
+        if not await job_repo.fail_video_job(db, job.id, job.worker_id, str(e), settings.VIDEO_JOB_MAX_ATTEMPTS):
+            logger.warning(f"Video job {job.id} was reclaimed by another worker; not recording the failure")
+
+
+async def _defer_if_running(db, job, media_id) -> bool:
+    """
+    Put the job back in the queue while an earlier job processes the same
+    content; it is claimed again once that one ends and then reuses its video.
+    """
+    running = await job_repo.get_running_job_for_media(db, media_id, job)
+    if not running:
+        return False
+    await job_repo.defer_video_job(db, job.id, job.worker_id)
+    logger.info(f"Video job {job.id} waits for job {running.id} (same content)")
+    return True
+
+
+async def _complete(db, job, video_id) -> None:
+    if not await job_repo.complete_video_job(db, job.id, job.worker_id, video_id):
+        logger.warning(f"Video job {job.id} was reclaimed by another worker; not marking it done")
+
+
+async def _heartbeat(job_id, worker_id: str) -> None:
+    """Refresh the job's locked_at while it runs, so long jobs are never reclaimed as stale"""
+    while True:
+        await asyncio.sleep(settings.VIDEO_JOB_HEARTBEAT_SECONDS)
+        db = _new_session()
+        try:
+            if not await job_repo.heartbeat_video_job(db, job_id, worker_id):
+                logger.warning(f"Video job {job_id} is no longer held by {worker_id}")
+                return
+        except Exception as e:
+            logger.warning(f"Heartbeat for video job {job_id} failed: {e}")
+        finally:
+            db.close()
+
+
+async def run_worker(worker_id: str) -> None:
+    storage = get_storage()
+    logger.info(f"Video worker {worker_id} started")
+
+    try:
+        while True:
+            db = _new_session()
+            try:
+                job = await job_repo.claim_next_video_job(
+                    db,
+                    worker_id=worker_id,
+                    max_attempts=settings.VIDEO_JOB_MAX_ATTEMPTS,
+                    stale_after_seconds=settings.VIDEO_JOB_STALE_AFTER_SECONDS
+                )
+                if job:
+                    logger.info(f"Video job {job.id} claimed by {worker_id}")
+                    heartbeat = asyncio.create_task(_heartbeat(job.id, worker_id))
+                    try:
+                        await run_job(db, job, storage)
+                    finally:
+                        heartbeat.cancel()
+            finally:
+                db.close()
+
+            if not job:
+                await asyncio.sleep(settings.VIDEO_JOB_POLL_INTERVAL)
+    finally:
+        await close_storage()
+        await close_llm_service()
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    from App.services.transcription import transcription_engine
+
+    try:
+        asyncio.run(run_worker(worker_id))
+    except KeyboardInterrupt:
+        logger.info(f"Video worker {worker_id} stopped")
+    finally:
+        transcription_engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()